@@ -5,24 +5,51 @@ This module initializes the Flask application and its extensions.
 It creates the app factory and configures all necessary components.
 """
 
-from flask import Flask
+from flask import Flask, Request, current_app
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
+import io
 import os
+import tempfile
 from dotenv import load_dotenv
 import threading
 import time
 
-from app.helpers.database import init_db, cleanup_expired_jobs
+from app.helpers.database import init_db, cleanup_expired_jobs, cleanup_expired_stats
 from app.helpers.image_processor import init_face_detector
+from app.helpers.memory_budget import init_memory_budget
 from config import Config
 
+DEFAULT_RATE_LIMITS = ["1 per second", "10 per minute", "1000 per day"]
+
 limiter = Limiter(
     key_func=get_remote_address,
-    default_limits=["1 per second", "10 per minute", "1000 per day"],
+    default_limits=DEFAULT_RATE_LIMITS,
 )
 
 
+class SpoolingRequest(Request):
+    """Request that spools large file uploads to temporary files."""
+
+    def _get_file_stream(
+        self, total_content_length, content_type, filename=None, content_length=None
+    ):
+        """
+        Create the stream an uploaded file is written to.
+
+        Uploads larger than the spool threshold are written to a temporary
+        file on disk instead of being held in memory.
+        """
+        threshold = current_app.config["UPLOAD_SPOOL_THRESHOLD"]
+
+        if total_content_length is None or total_content_length > threshold:
+            return tempfile.TemporaryFile(
+                "rb+", dir=current_app.config["UPLOAD_SPOOL_DIR"]
+            )
+
+        return io.BytesIO()
+
+
 def create_app(config_class=Config):
     """
     Create and configure the Flask application.
@@ -39,11 +66,48 @@ def create_app(config_class=Config):
     # Create Flask app
     app = Flask(__name__)
     app.config.from_object(config_class)
+    app.request_class = SpoolingRequest
 
     # Initialize limiter
     limiter.init_app(app)
     limiter.key_func = lambda: get_remote_address()
 
+    # Initialize face detector first, its tile worker processes are forked
+    # before the cleanup and write-behind threads are started
+    predictor_path = app.config["PREDICTOR_PATH"]
+    backend = app.config["FACE_DETECTOR_BACKEND"]
+    if backend == "cnn" and not os.path.exists(app.config["CNN_MODEL_PATH"]):
+        app.logger.warning(
+            f"CNN model file not found at {app.config['CNN_MODEL_PATH']}. "
+            f"Falling back to the HOG face detector."
+        )
+        backend = "hog"
+
+    if os.path.exists(predictor_path):
+        init_face_detector(
+            predictor_path,
+            tiled_threshold=app.config["TILED_DETECTION_THRESHOLD"],
+            tiled_size=app.config["TILE_SIZE"],
+            tiled_overlap=app.config["TILE_OVERLAP"],
+            tiled_workers=app.config["TILE_WORKERS"],
+            backend=backend,
+            cnn_model_path=app.config["CNN_MODEL_PATH"],
+            cnn_batch_size=app.config["CNN_BATCH_SIZE"],
+            cnn_batch_wait_ms=app.config["CNN_BATCH_WAIT_MS"],
+            cnn_upsample_times=app.config["CNN_UPSAMPLE"],
+            upsample_times=app.config["DETECTOR_UPSAMPLE"],
+        )
+    else:
+        app.logger.warning(
+            f"Predictor file not found at {predictor_path}. "
+            f"Face detection will not be available."
+        )
+
+    # Initialize memory budget
+    init_memory_budget(
+        app.config["MEMORY_BUDGET"], app.config["MEMORY_BUDGET_WAIT_TIMEOUT"]
+    )
+
     # Initialize database
     init_db(app)
 
@@ -51,6 +115,9 @@ def create_app(config_class=Config):
     def run_cleanup():
         while True:
             cleanup_expired_jobs(app.config["JOB_EXPIRE_AFTER"])
+            cleanup_expired_stats(
+                app.config["STATS_MINUTE_RETENTION"], app.config["STATS_HOUR_RETENTION"]
+            )
             # Sleep for 15 minutes
             time.sleep(900)
 
@@ -58,19 +125,33 @@ def create_app(config_class=Config):
     cleanup_thread = threading.Thread(target=run_cleanup, daemon=True)
     cleanup_thread.start()
 
-    # Initialize face detector
-    predictor_path = app.config["PREDICTOR_PATH"]
-    if os.path.exists(predictor_path):
-        init_face_detector(predictor_path)
-    else:
-        app.logger.warning(
-            f"Predictor file not found at {predictor_path}. "
-            f"Face detection will not be available."
-        )
-
     # Register routes
     from app.routes import bp as routes_bp
 
     app.register_blueprint(routes_bp)
 
     return app
+
+
+def create_asgi_app(config_class=Config):
+    """
+    Create the ASGI application serving the API asynchronously.
+
+    The Flask application is created first so that configuration, the
+    database, the face detector and the cleanup task are shared with the
+    WSGI entry point.
+
+    Args:
+        config_class: Configuration class
+
+    Returns:
+        Starlette: Configured ASGI application
+    """
+    from starlette.applications import Starlette
+
+    from app.async_routes import routes, init_async_routes, lifespan
+
+    app = create_app(config_class)
+    init_async_routes(app.config)
+
+    return Starlette(debug=app.config["DEBUG"], routes=routes, lifespan=lifespan)
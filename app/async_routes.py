@@ -0,0 +1,426 @@
+"""
+Asynchronous application routes
+
+This module defines the API endpoints for the ASGI entry point.
+It mirrors the routes in routes.py, streaming request bodies and result
+files without blocking and running CPU and database work in bounded
+executors.
+"""
+
+import asyncio
+import contextlib
+import math
+import os
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from limits import parse_many
+from limits.storage import MemoryStorage
+from limits.strategies import FixedWindowRateLimiter
+from starlette.responses import FileResponse, JSONResponse, Response
+from starlette.routing import Route
+
+from app import DEFAULT_RATE_LIMITS
+from app.helpers.image_processor import (
+    process_upload,
+    format_server_timing,
+    get_detector_stats,
+    ImageDecodeError,
+)
+from app.helpers.memory_budget import (
+    MemoryBudgetExceeded,
+    ImageTooLarge,
+    get_budget_usage,
+)
+from app.helpers.database import (
+    save_job,
+    get_cached_job,
+    load_job,
+    get_cached_result_image,
+    get_result_image_path,
+    get_recent_jobs,
+    count_jobs,
+    get_stats,
+    get_write_behind_stats,
+    stop_write_behind,
+)
+from app.helpers.cache import get_cache_stats
+
+INDEX_PATH = os.path.join(os.path.dirname(__file__), "templates", "index.html")
+
+# Global variables
+cpu_executor = None
+db_executor = None
+rate_limits_enabled = True
+rate_limiter = FixedWindowRateLimiter(MemoryStorage())
+
+# Rate limits per route, matching the decorators in routes.py
+OVERLAY_LIMITS = parse_many(";".join(DEFAULT_RATE_LIMITS + ["10 per minute"]))
+RESULT_IMAGE_LIMITS = parse_many("20 per minute")
+
+
+def init_async_routes(config):
+    """
+    Create the executors used by the asynchronous routes.
+
+    Args:
+        config: Flask application configuration
+    """
+    global cpu_executor, db_executor, rate_limits_enabled
+
+    cpu_executor = ThreadPoolExecutor(
+        max_workers=config["ASGI_CPU_WORKERS"] or os.cpu_count() or 1,
+        thread_name_prefix="asgi-cpu",
+    )
+    db_executor = ThreadPoolExecutor(
+        max_workers=config["ASGI_DB_WORKERS"], thread_name_prefix="asgi-db"
+    )
+    rate_limits_enabled = config.get("RATELIMIT_ENABLED", True)
+
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    """
+    Shut the executors down and flush pending jobs when the ASGI server
+    stops.
+
+    Args:
+        app: ASGI application instance
+    """
+    yield
+
+    cpu_executor.shutdown(wait=True)
+    db_executor.shutdown(wait=True)
+    stop_write_behind()
+
+
+async def run_cpu(func, *args):
+    """Run CPU-bound work in the CPU executor."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(cpu_executor, func, *args)
+
+
+async def run_db(func, *args):
+    """Run blocking database and file work in the database executor."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(db_executor, func, *args)
+
+
+def check_rate_limits(request, limits, scope):
+    """
+    Record a hit against the rate limits of a route.
+
+    Args:
+        request: Incoming request
+        limits (list): Rate limit items for the route
+        scope (str): Name of the route the limits apply to
+
+    Returns:
+        JSONResponse: Error response if a limit is exceeded, otherwise None
+    """
+    if not rate_limits_enabled:
+        return None
+
+    key = request.client.host if request.client else "127.0.0.1"
+
+    for item in limits:
+        if not rate_limiter.hit(item, scope, key):
+            return JSONResponse(
+                {"error": f"Rate limit exceeded: {item}"}, status_code=429
+            )
+
+    return None
+
+
+async def index(request):
+    """
+    Serve the index page with API documentation.
+
+    Returns:
+        HTML: Index HTML file
+    """
+    return FileResponse(INDEX_PATH, media_type="text/html")
+
+
+async def get_jobs_api(request):
+    """
+    Retrieve a list of recent jobs.
+
+    Query parameters:
+        page (int): Page number (default: 1)
+        limit (int): Number of jobs per page (default: 10)
+
+    Returns:
+        JSON: List of recent jobs with pagination metadata
+    """
+    try:
+        # Get pagination parameters
+        page = int(request.query_params.get("page", 1))
+        limit = int(request.query_params.get("limit", 10))
+
+        # Get total job count and recent jobs
+        total_jobs = await run_db(count_jobs)
+        jobs = await run_db(get_recent_jobs, page, limit)
+
+        # Calculate total pages
+        total_pages = (total_jobs + limit - 1) // limit if limit > 0 else 1
+
+        return JSONResponse(
+            {
+                "jobs": jobs,
+                "pagination": {
+                    "page": page,
+                    "limit": limit,
+                    "total_jobs": total_jobs,
+                    "total_pages": total_pages,
+                },
+            }
+        )
+
+    except Exception as e:
+        return JSONResponse({"error": str(e)}, status_code=500)
+
+
+async def get_stats_api(request):
+    """
+    Retrieve job and processing time statistics.
+
+    Query parameters:
+        resolution (str): Bucket size, "minute" or "hour" (default: hour)
+        since (int): Start of the time range as a Unix timestamp
+            (default: 24 hours before until)
+        until (int): End of the time range as a Unix timestamp (default: now)
+
+    Returns:
+        JSON: Statistics per bucket and for the whole time range
+    """
+    try:
+        resolution = request.query_params.get("resolution", "hour")
+        since = request.query_params.get("since")
+        until = request.query_params.get("until")
+
+        stats = await run_db(
+            get_stats,
+            resolution,
+            int(since) if since else None,
+            int(until) if until else None,
+        )
+        return JSONResponse(stats)
+
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+
+    except Exception as e:
+        return JSONResponse({"error": str(e)}, status_code=500)
+
+
+async def get_metrics_api(request):
+    """
+    Retrieve instrumentation about the running worker process.
+
+    Returns:
+        JSON: Memory budget usage, write-behind persistence, cache and face
+            detector statistics
+    """
+    try:
+        return JSONResponse(
+            {
+                "memory_budget": get_budget_usage(),
+                "write_behind": get_write_behind_stats(),
+                "cache": get_cache_stats(),
+                "detector": get_detector_stats(),
+            }
+        )
+
+    except Exception as e:
+        return JSONResponse({"error": str(e)}, status_code=500)
+
+
+async def overlay(request):
+    """
+    Process an image to detect faces and overlay facial landmarks.
+
+    The upload is received without blocking the event loop. Decoding,
+    detection and encoding run in the CPU executor and the job is saved in
+    the database executor.
+
+    An optional deadline in milliseconds can be given in the X-Deadline-Ms
+    header or the deadline_ms parameter. Processing quality is then lowered
+    as needed to answer in time, and the degradations applied are reported
+    in the "quality" field of the response.
+
+    Returns:
+        JSON: Job data including URLs and processing information
+    """
+    limited = check_rate_limits(request, OVERLAY_LIMITS, "overlay")
+    if limited:
+        return limited
+
+    form = None
+
+    try:
+        start_time = time.time()
+        request_start = time.monotonic()
+
+        # Receive the multipart body, large files are spooled to disk
+        form = await request.form()
+        file = form.get("image")
+
+        # Check if image file is present in the request
+        if file is None or isinstance(file, str):
+            return JSONResponse(
+                {"error": "No image file provided"}, status_code=400
+            )
+
+        # Validate file type
+        if not file.filename or "." not in file.filename:
+            return JSONResponse({"error": "Invalid file"}, status_code=400)
+
+        # Read the optional deadline
+        deadline_ms = (
+            request.headers.get("X-Deadline-Ms")
+            or request.query_params.get("deadline_ms")
+            or form.get("deadline_ms")
+        )
+        deadline = None
+        if deadline_ms is not None:
+            try:
+                deadline_ms = float(deadline_ms)
+            except ValueError:
+                return JSONResponse({"error": "Invalid deadline"}, status_code=400)
+            if not math.isfinite(deadline_ms) or deadline_ms <= 0:
+                return JSONResponse({"error": "Invalid deadline"}, status_code=400)
+
+            # The deadline runs from the start of the request, so time spent
+            # receiving the upload and waiting for a worker counts against it
+            deadline = request_start + deadline_ms / 1000
+
+        # Decode, process and encode the image
+        timings = {"receive": (time.time() - start_time) * 1000}
+        quality = {}
+        result_image_bytes, result_data = await run_cpu(
+            process_upload, file.file, timings, deadline, quality
+        )
+
+        # Generate a unique job ID
+        job_id = str(uuid.uuid4())
+
+        # Calculate processing time
+        end_time = time.time()
+        processing_time = f"{(end_time - start_time) * 1000:.2f} ms"
+
+        # Save job data to database
+        save_start = time.time()
+        # Handing a job to the write-behind writer may wait for room, keep
+        # that wait off the database executor that serves reads
+        run_save = run_cpu if get_write_behind_stats()["enabled"] else run_db
+        job_data = await run_save(
+            save_job, job_id, result_image_bytes, processing_time, result_data
+        )
+        timings["save"] = (time.time() - save_start) * 1000
+
+        if deadline is not None:
+            job_data = {**job_data, "quality": quality}
+
+        return JSONResponse(
+            job_data, headers={"Server-Timing": format_server_timing(timings)}
+        )
+
+    except ImageDecodeError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+
+    except ImageTooLarge as e:
+        return JSONResponse({"error": str(e)}, status_code=413)
+
+    except MemoryBudgetExceeded as e:
+        return JSONResponse(
+            {"error": str(e)}, status_code=503, headers={"Retry-After": "1"}
+        )
+
+    except Exception as e:
+        return JSONResponse({"error": str(e)}, status_code=500)
+
+    finally:
+        if form is not None:
+            await form.close()
+
+
+async def get_job_route(request):
+    """
+    Retrieve information about a specific job.
+
+    Pending and recently used jobs are answered on the event loop, only
+    cache misses wait for the database executor.
+
+    Returns:
+        JSON: Job data including URLs and processing information
+    """
+    try:
+        job_id = request.path_params["job_id"]
+        job_data = get_cached_job(job_id) or await run_db(load_job, job_id)
+
+        if job_data:
+            return JSONResponse(job_data)
+        else:
+            return JSONResponse({"error": "Job not found"}, status_code=404)
+
+    except Exception as e:
+        return JSONResponse({"error": str(e)}, status_code=500)
+
+
+async def get_result_image_route(request):
+    """
+    Retrieve the processed image for a specific job.
+
+    Recently used images and images of jobs that have not been flushed to
+    disk yet are served from memory, other images are streamed from disk
+    without blocking the event loop.
+
+    Returns:
+        File: Processed image as PNG
+    """
+    limited = check_rate_limits(request, RESULT_IMAGE_LIMITS, "result_image")
+    if limited:
+        return limited
+
+    try:
+        job_id = request.path_params["job_id"]
+        result_image = get_cached_result_image(job_id)
+
+        if result_image:
+            return Response(
+                result_image,
+                media_type="image/png",
+                headers={
+                    "Content-Disposition": 'attachment; filename="result_image.png"'
+                },
+            )
+
+        image_path = await run_db(get_result_image_path, job_id)
+
+        if image_path:
+            return FileResponse(
+                image_path,
+                media_type="image/png",
+                filename="result_image.png",
+            )
+
+        # Pending jobs were checked above and are on disk once flushed
+        return JSONResponse({"error": "Image not found"}, status_code=404)
+
+    except Exception as e:
+        return JSONResponse({"error": str(e)}, status_code=500)
+
+
+routes = [
+    Route("/", index, methods=["GET"]),
+    Route("/api/jobs", get_jobs_api, methods=["GET"]),
+    Route("/api/stats", get_stats_api, methods=["GET"]),
+    Route("/api/metrics", get_metrics_api, methods=["GET"]),
+    Route("/overlay", overlay, methods=["POST"]),
+    Route("/jobs/{job_id}", get_job_route, methods=["GET"]),
+    Route(
+        "/jobs/{job_id}/result_image.png", get_result_image_route, methods=["GET"]
+    ),
+]
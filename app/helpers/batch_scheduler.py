@@ -0,0 +1,194 @@
+"""
+Micro-batching scheduler module
+
+This module collects detection requests from concurrent callers into small
+batches. Requests wait for at most a few milliseconds or until a batch is
+full, are grouped by similar image dimensions and padded to a common size,
+and are then run through a single batched detector call.
+"""
+
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+
+class MicroBatcher:
+    """Groups concurrent detection requests into batched detector calls."""
+
+    def __init__(self, run_batch, max_batch_size=8, max_wait_ms=5, size_step=64):
+        """
+        Start the scheduler thread.
+
+        Args:
+            run_batch (callable): Function taking a list of equally sized
+                images and returning a list of detections for each image,
+                as (left, top, right, bottom, score) tuples
+            max_batch_size (int): Maximum number of images per batch
+            max_wait_ms (float): Maximum time a request waits for a batch
+                to fill up, in milliseconds
+            size_step (int): Images are padded up to a multiple of this many
+                pixels so that similar sizes share a batch
+        """
+        self.run_batch = run_batch
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000
+        self.size_step = max(1, int(size_step))
+
+        self.queue = []
+        self.condition = threading.Condition()
+        self.closed = False
+        self.stats = {"batches": 0, "images": 0}
+
+        self.thread = threading.Thread(
+            target=self._run, name="micro-batcher", daemon=True
+        )
+        self.thread.start()
+
+    def submit(self, image):
+        """
+        Queue an image for detection.
+
+        Args:
+            image (numpy.ndarray): Image to run the detector on
+
+        Returns:
+            Future: Resolves to the detections for the image
+        """
+        future = Future()
+        height, width = image.shape[:2]
+        key = (
+            -(-height // self.size_step) * self.size_step,
+            -(-width // self.size_step) * self.size_step,
+        )
+
+        with self.condition:
+            if self.closed:
+                raise RuntimeError("Micro-batcher is closed")
+            self.queue.append((key, image, future, time.monotonic()))
+            self.condition.notify()
+
+        return future
+
+    def detect(self, image):
+        """
+        Run detection on an image and wait for the result.
+
+        Args:
+            image (numpy.ndarray): Image to run the detector on
+
+        Returns:
+            list: Detections as (left, top, right, bottom, score) tuples
+        """
+        return self.submit(image).result()
+
+    def close(self):
+        """Stop the scheduler after running all queued requests."""
+        with self.condition:
+            self.closed = True
+            self.condition.notify()
+
+        self.thread.join()
+
+    def _next_batch(self):
+        """
+        Wait for the next batch to be ready and take it off the queue.
+
+        Returns:
+            list: Queued requests sharing the same padded size, or None when
+                the scheduler is closed and the queue is empty
+        """
+        with self.condition:
+            while not self.queue and not self.closed:
+                self.condition.wait()
+
+            if not self.queue:
+                return None
+
+            # Wait until a group is full or the oldest request's time is up
+            deadline = self.queue[0][3] + self.max_wait
+            full_key = None
+            while not self.closed:
+                counts = {}
+                for key, _, _, _ in self.queue:
+                    counts[key] = counts.get(key, 0) + 1
+                    if counts[key] >= self.max_batch_size:
+                        full_key = key
+                        break
+
+                remaining = deadline - time.monotonic()
+                if full_key is not None or remaining <= 0:
+                    break
+                self.condition.wait(remaining)
+
+            # Serve a full group first, otherwise the oldest request's group
+            batch_key = full_key if full_key is not None else self.queue[0][0]
+            batch = []
+            remaining_queue = []
+            for request in self.queue:
+                if request[0] == batch_key and len(batch) < self.max_batch_size:
+                    batch.append(request)
+                else:
+                    remaining_queue.append(request)
+            self.queue = remaining_queue
+
+            return batch
+
+    def _run(self):
+        """Run batches until the scheduler is closed."""
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+
+            (height, width) = batch[0][0]
+            images = []
+            for _, image, _, _ in batch:
+                # Pad every image to the shared size of the group
+                padded = np.zeros((height, width) + image.shape[2:], image.dtype)
+                padded[: image.shape[0], : image.shape[1]] = image
+                images.append(padded)
+
+            try:
+                results = self.run_batch(images)
+            except Exception as e:
+                for _, _, future, _ in batch:
+                    future.set_exception(e)
+                continue
+
+            self.stats["batches"] += 1
+            self.stats["images"] += len(batch)
+
+            for (_, image, future, _), detections in zip(batch, results):
+                future.set_result(_clip_detections(detections, image.shape))
+
+
+def _clip_detections(detections, shape):
+    """
+    Drop detections found in the padding and clip the rest to the image.
+
+    Args:
+        detections (list): Detections on the padded image
+        shape (tuple): Shape of the original image
+
+    Returns:
+        list: Detections within the original image
+    """
+    height, width = shape[:2]
+    clipped = []
+
+    for left, top, right, bottom, score in detections:
+        if (left + right) // 2 >= width or (top + bottom) // 2 >= height:
+            continue
+        clipped.append(
+            (
+                max(0, left),
+                max(0, top),
+                min(width - 1, right),
+                min(height - 1, bottom),
+                score,
+            )
+        )
+
+    return clipped
@@ -0,0 +1,183 @@
+"""
+Cache module
+
+This module provides bounded in-process caches for recently created or
+requested jobs, so that clients polling a job and its result image do not
+hit the database and the file system on every request.
+"""
+
+import threading
+from collections import OrderedDict
+
+# Bytes counted per cached job on top of its encoded result data
+JOB_ENTRY_OVERHEAD = 256
+
+
+class LRUCache:
+    """Least recently used cache bounded by the total size of its entries."""
+
+    def __init__(self, max_bytes=0):
+        """
+        Create an empty cache.
+
+        Args:
+            max_bytes (int): Maximum total size of the entries in bytes
+                (0 disables the cache)
+        """
+        self.max_bytes = max(0, int(max_bytes))
+        self.entries = OrderedDict()
+        self.size = 0
+        self.lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def resize(self, max_bytes):
+        """
+        Change the maximum size of the cache, evicting entries if needed.
+
+        Args:
+            max_bytes (int): Maximum total size of the entries in bytes
+        """
+        with self.lock:
+            self.max_bytes = max(0, int(max_bytes))
+            self._evict()
+
+    def get(self, key):
+        """
+        Look up an entry and mark it as recently used.
+
+        Args:
+            key (str): Entry key
+
+        Returns:
+            The cached value or None if the key is not cached
+        """
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.stats["misses"] += 1
+                return None
+
+            self.entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return entry[0]
+
+    def put(self, key, value, size, created_at):
+        """
+        Add or replace an entry, evicting the least recently used entries.
+
+        Entries larger than the whole cache are not stored.
+
+        Args:
+            key (str): Entry key
+            value: Value to cache
+            size (int): Size of the value in bytes
+            created_at (int): Creation time of the job the entry belongs to
+        """
+        with self.lock:
+            self._remove(key)
+
+            if size > self.max_bytes:
+                return
+
+            self.entries[key] = (value, size, created_at)
+            self.size += size
+            self._evict()
+
+    def discard(self, keys):
+        """
+        Remove entries from the cache.
+
+        Args:
+            keys (list): Keys of the entries to remove
+        """
+        with self.lock:
+            for key in keys:
+                self._remove(key)
+
+    def discard_older_than(self, timestamp):
+        """
+        Remove entries belonging to jobs created before a point in time.
+
+        Args:
+            timestamp (int): Unix timestamp
+        """
+        with self.lock:
+            expired = [
+                key
+                for key, (_, _, created_at) in self.entries.items()
+                if created_at < timestamp
+            ]
+            for key in expired:
+                self._remove(key)
+
+    def get_stats(self):
+        """
+        Get usage statistics for the cache.
+
+        Returns:
+            dict: Entry count, size, hit and miss counts and the hit ratio
+        """
+        with self.lock:
+            lookups = self.stats["hits"] + self.stats["misses"]
+            return {
+                "entries": len(self.entries),
+                "bytes": self.size,
+                "max_bytes": self.max_bytes,
+                **self.stats,
+                "hit_ratio": (
+                    round(self.stats["hits"] / lookups, 4) if lookups else None
+                ),
+            }
+
+    def _remove(self, key):
+        """Remove an entry, the lock must be held."""
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.size -= entry[1]
+
+    def _evict(self):
+        """Evict least recently used entries to fit, the lock must be held."""
+        while self.size > self.max_bytes:
+            _, (_, size, _) = self.entries.popitem(last=False)
+            self.size -= size
+            self.stats["evictions"] += 1
+
+
+# Caches for job data and result images, sized by init_caches
+job_cache = LRUCache()
+image_cache = LRUCache()
+
+
+def init_caches(job_max_bytes, image_max_bytes):
+    """
+    Set the sizes of the job data and result image caches.
+
+    Args:
+        job_max_bytes (int): Maximum size of cached job data in bytes
+        image_max_bytes (int): Maximum size of cached result images in bytes
+    """
+    job_cache.resize(job_max_bytes)
+    image_cache.resize(image_max_bytes)
+
+
+def job_entry_size(result_data):
+    """
+    Estimate the memory used by a cached job.
+
+    Args:
+        result_data (str): JSON-encoded result data of the job
+
+    Returns:
+        int: Approximate size in bytes
+    """
+    return len(result_data or "") + JOB_ENTRY_OVERHEAD
+
+
+def get_cache_stats():
+    """
+    Get usage statistics for the job data and result image caches.
+
+    Returns:
+        dict: Statistics for each cache
+    """
+    return {"jobs": job_cache.get_stats(), "images": image_cache.get_stats()}
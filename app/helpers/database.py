@@ -9,13 +9,49 @@ import sqlite3
 import os
 import json
 import time
+import atexit
+import threading
 from datetime import datetime
 import shutil
 
+from app.helpers.cache import job_cache, image_cache, init_caches, job_entry_size
+from app.helpers.latency_sketch import (
+    sketch_add,
+    sketch_merge,
+    sketch_count,
+    sketch_summary,
+    sketch_loads,
+)
+
 # Global variables
 db_connection = None
 image_storage_path = None
 
+# Serializes transactions, the connection is shared by all request threads
+db_write_lock = threading.Lock()
+
+# Write-behind persistence
+write_behind_enabled = False
+write_behind_settings = {}
+pending_jobs = {}
+pending_bytes = 0
+pending_condition = threading.Condition()
+writer_thread = None
+writer_stopping = False
+writer_atexit_registered = False
+write_behind_stats = {
+    "flushed_jobs": 0,
+    "flushed_batches": 0,
+    "failed_flushes": 0,
+    "enqueue_timeouts": 0,
+}
+
+# Statistics rollup resolutions and their bucket sizes in seconds
+STATS_RESOLUTIONS = {"minute": 60, "hour": 3600}
+
+# Face counts at or above this share one faces-per-image histogram bucket
+FACES_HISTOGRAM_MAX = 20
+
 
 def init_db(app):
     """
@@ -24,21 +60,54 @@ def init_db(app):
     Args:
         app: Flask application instance
     """
+    # Get database path from config
+    db_path = app.config["DATABASE_PATH"]
+
+    # Connect to the database and create tables
+    connect_db(db_path, app.config["IMAGE_STORAGE_PATH"])
+
+    # Size the caches for recent jobs and result images
+    init_caches(app.config["JOB_CACHE_MAX_BYTES"], app.config["IMAGE_CACHE_MAX_BYTES"])
+
+    # Schedule cleanup task
+    cleanup_expired_jobs(app.config["JOB_EXPIRE_AFTER"])
+
+    # Start the background writer for write-behind persistence
+    if app.config["WRITE_BEHIND"]:
+        start_write_behind(
+            db_path,
+            max_pending_jobs=app.config["WRITE_BEHIND_MAX_PENDING_JOBS"],
+            max_pending_bytes=app.config["WRITE_BEHIND_MAX_PENDING_BYTES"],
+            batch_size=app.config["WRITE_BEHIND_BATCH_SIZE"],
+            flush_interval=app.config["WRITE_BEHIND_FLUSH_INTERVAL"],
+            shutdown_timeout=app.config["WRITE_BEHIND_SHUTDOWN_TIMEOUT"],
+            enqueue_timeout=app.config["WRITE_BEHIND_ENQUEUE_TIMEOUT"],
+        )
+
+
+def connect_db(db_path, storage_path):
+    """
+    Open the database connection and create tables and storage directories.
+
+    This does not depend on Flask, so command-line tools can write to the
+    same job store as the API.
+
+    Args:
+        db_path (str): Path to the SQLite database
+        storage_path (str): Directory for processed images
+    """
     global db_connection, image_storage_path
 
     # Set image storage path
-    image_storage_path = app.config["IMAGE_STORAGE_PATH"]
+    image_storage_path = storage_path
 
     # Create image storage directory if it doesn't exist
     if not os.path.exists(image_storage_path):
         os.makedirs(image_storage_path)
 
-    # Get database path from config
-    db_path = app.config["DATABASE_PATH"]
-
     # Create directory for database if it doesn't exist
     db_dir = os.path.dirname(db_path)
-    if not os.path.exists(db_dir):
+    if db_dir and not os.path.exists(db_dir):
         os.makedirs(db_dir)
 
     # Connect to SQLite database
@@ -68,12 +137,540 @@ def init_db(app):
     """
     )
 
+    # Create statistics rollup table if it doesn't exist
+    cursor.execute(
+        """
+    CREATE TABLE IF NOT EXISTS job_stats (
+        resolution TEXT,
+        bucket_start INTEGER,
+        jobs INTEGER,
+        faces INTEGER,
+        zero_face_jobs INTEGER,
+        max_faces INTEGER,
+        total_processing_ms REAL,
+        latency_sketch TEXT,
+        faces_histogram TEXT,
+        PRIMARY KEY (resolution, bucket_start)
+    )
+    """
+    )
+
     # Commit changes and close cursor
     db_connection.commit()
     cursor.close()
 
-    # Schedule cleanup task
-    cleanup_expired_jobs(app.config["JOB_EXPIRE_AFTER"])
+
+def start_write_behind(
+    db_path,
+    max_pending_jobs=1000,
+    max_pending_bytes=268435456,
+    batch_size=100,
+    flush_interval=0.05,
+    shutdown_timeout=10.0,
+    enqueue_timeout=10.0,
+):
+    """
+    Start the background writer that flushes completed jobs in batches.
+
+    Args:
+        db_path (str): Path to the SQLite database
+        max_pending_jobs (int): Maximum number of unflushed jobs
+        max_pending_bytes (int): Maximum size of unflushed result images
+        batch_size (int): Maximum number of jobs committed in one transaction
+        flush_interval (float): Seconds to wait for a batch to fill up
+        shutdown_timeout (float): Seconds to wait for pending jobs to be
+            flushed at shutdown
+        enqueue_timeout (float): Seconds a new job waits for room in the
+            pending map before it is written synchronously
+    """
+    global write_behind_enabled, writer_thread, writer_stopping
+    global writer_atexit_registered
+
+    if writer_thread is not None and writer_thread.is_alive():
+        return
+
+    write_behind_settings.update(
+        max_pending_jobs=max(1, int(max_pending_jobs)),
+        max_pending_bytes=max(1, int(max_pending_bytes)),
+        batch_size=max(1, int(batch_size)),
+        flush_interval=float(flush_interval),
+        shutdown_timeout=float(shutdown_timeout),
+        enqueue_timeout=float(enqueue_timeout),
+    )
+
+    writer_stopping = False
+    writer_thread = threading.Thread(
+        target=_run_writer, args=(db_path,), name="write-behind", daemon=True
+    )
+    writer_thread.start()
+    write_behind_enabled = True
+
+    if not writer_atexit_registered:
+        atexit.register(stop_write_behind)
+        writer_atexit_registered = True
+
+
+def stop_write_behind(timeout=None):
+    """
+    Stop the background writer after flushing all pending jobs.
+
+    New jobs saved while the writer is stopping are written synchronously.
+
+    Args:
+        timeout (float): Seconds to wait for pending jobs to be flushed
+            (defaults to the configured shutdown timeout)
+
+    Returns:
+        int: Number of jobs that could not be flushed in time
+    """
+    global write_behind_enabled, writer_stopping
+
+    if writer_thread is None:
+        return 0
+
+    if timeout is None:
+        timeout = write_behind_settings.get("shutdown_timeout", 10.0)
+
+    with pending_condition:
+        write_behind_enabled = False
+        writer_stopping = True
+        pending_condition.notify_all()
+
+    writer_thread.join(timeout)
+
+    with pending_condition:
+        remaining = len(pending_jobs)
+
+    if remaining:
+        print(f"Write-behind shutdown timed out with {remaining} unflushed jobs")
+
+    return remaining
+
+
+def _run_writer(db_path):
+    """
+    Flush pending jobs to the database in group-committed batches.
+
+    Args:
+        db_path (str): Path to the SQLite database
+    """
+    connection = sqlite3.connect(db_path)
+    connection.row_factory = sqlite3.Row
+    batch_size = write_behind_settings["batch_size"]
+    flush_interval = write_behind_settings["flush_interval"]
+
+    while True:
+        with pending_condition:
+            while not pending_jobs and not writer_stopping:
+                pending_condition.wait()
+
+            if not pending_jobs:
+                break
+
+            # Give the batch a moment to fill up before committing
+            deadline = time.monotonic() + flush_interval
+            while len(pending_jobs) < batch_size and not writer_stopping:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                pending_condition.wait(remaining)
+
+            batch = list(pending_jobs.values())[:batch_size]
+
+        try:
+            _write_jobs(connection, batch)
+        except Exception as e:
+            print(f"Error in write-behind flush: {e}")
+            with pending_condition:
+                write_behind_stats["failed_flushes"] += 1
+            if writer_stopping:
+                break
+            time.sleep(max(flush_interval, 1.0))
+            continue
+
+        _remove_pending(batch)
+
+    connection.close()
+
+
+def _remove_pending(batch):
+    """
+    Remove flushed jobs from the pending map and wake up waiting writers.
+
+    Args:
+        batch (list): Jobs that were flushed
+    """
+    global pending_bytes
+
+    with pending_condition:
+        for job in batch:
+            if pending_jobs.pop(job["job_id"], None) is not None:
+                pending_bytes -= len(job["image"])
+
+        write_behind_stats["flushed_jobs"] += len(batch)
+        write_behind_stats["flushed_batches"] += 1
+        pending_condition.notify_all()
+
+
+def _enqueue_job(job):
+    """
+    Add a completed job to the pending map for the background writer.
+
+    Blocks while the maximum amount of unflushed work is reached, for at
+    most the enqueue timeout.
+
+    Args:
+        job (dict): Job row and result image
+
+    Returns:
+        bool: True if the job was queued, False if the writer is stopped or
+            did not make room in time
+    """
+    global pending_bytes
+
+    size = len(job["image"])
+    deadline = time.monotonic() + write_behind_settings["enqueue_timeout"]
+
+    with pending_condition:
+        while write_behind_enabled and pending_jobs and (
+            len(pending_jobs) >= write_behind_settings["max_pending_jobs"]
+            or pending_bytes + size > write_behind_settings["max_pending_bytes"]
+        ):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                write_behind_stats["enqueue_timeouts"] += 1
+                return False
+            pending_condition.wait(remaining)
+
+        if not write_behind_enabled:
+            return False
+
+        pending_jobs[job["job_id"]] = job
+        pending_bytes += size
+        pending_condition.notify_all()
+
+    return True
+
+
+def get_write_behind_stats():
+    """
+    Get statistics about write-behind persistence.
+
+    Returns:
+        dict: Pending job counts and flush counters
+    """
+    with pending_condition:
+        return {
+            "enabled": write_behind_enabled,
+            "pending_jobs": len(pending_jobs),
+            "pending_bytes": pending_bytes,
+            **write_behind_stats,
+        }
+
+
+def _write_jobs(connection, jobs):
+    """
+    Write result images to disk and insert jobs in a single transaction.
+
+    Args:
+        connection (sqlite3.Connection): Database connection to write with
+        jobs (list): Job rows and result images
+    """
+    rows = []
+
+    for job in jobs:
+        # Create job directory
+        job_dir = os.path.join(image_storage_path, job["job_id"])
+        if not os.path.exists(job_dir):
+            os.makedirs(job_dir)
+
+        # Save image to file
+        image_path = os.path.join(job_dir, "result_image.png")
+        with open(image_path, "wb") as f:
+            f.write(job["image"])
+
+        rows.append(
+            (
+                job["job_id"],
+                image_path,
+                job["processing_time"],
+                job["result_data"],
+                job["created_at"],
+            )
+        )
+
+    # Only one thread may use a transaction on the shared connection
+    with db_write_lock:
+        # Create a new cursor for this operation
+        cursor = connection.cursor()
+
+        try:
+            # Take the database write lock up front so rollups are updated
+            # atomically
+            cursor.execute("BEGIN IMMEDIATE")
+
+            # Insert job data into database
+            cursor.executemany(
+                "INSERT INTO jobs (job_id, result_image_path, processing_time, result_data, created_at) VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+
+            # Update statistics rollups in the same transaction
+            _update_stats(cursor, jobs)
+
+            connection.commit()
+        except Exception:
+            connection.rollback()
+            raise
+        finally:
+            # Close cursor
+            cursor.close()
+
+
+def _parse_processing_ms(processing_time):
+    """
+    Parse a formatted processing time such as "12.34 ms".
+
+    Args:
+        processing_time (str): Formatted processing time
+
+    Returns:
+        float: Processing time in milliseconds or None if it cannot be parsed
+    """
+    try:
+        return float(str(processing_time).split()[0])
+    except (ValueError, IndexError):
+        return None
+
+
+def _update_stats(cursor, jobs):
+    """
+    Add jobs to the per-minute and per-hour statistics rollups.
+
+    Args:
+        cursor (sqlite3.Cursor): Cursor inside the transaction saving the jobs
+        jobs (list): Jobs being saved
+    """
+    buckets = {}
+
+    # Aggregate the jobs per bucket before touching the database
+    for job in jobs:
+        face_count = job["face_count"]
+        processing_ms = _parse_processing_ms(job["processing_time"])
+
+        for resolution, size in STATS_RESOLUTIONS.items():
+            key = (resolution, job["created_at"] - job["created_at"] % size)
+            bucket = buckets.setdefault(
+                key,
+                {
+                    "jobs": 0,
+                    "faces": 0,
+                    "zero_face_jobs": 0,
+                    "max_faces": 0,
+                    "total_processing_ms": 0.0,
+                    "latency_sketch": {},
+                    "faces_histogram": {},
+                },
+            )
+
+            bucket["jobs"] += 1
+            bucket["faces"] += face_count
+            bucket["zero_face_jobs"] += face_count == 0
+            bucket["max_faces"] = max(bucket["max_faces"], face_count)
+
+            if processing_ms is not None:
+                bucket["total_processing_ms"] += processing_ms
+                sketch_add(bucket["latency_sketch"], processing_ms)
+
+            histogram_key = str(min(face_count, FACES_HISTOGRAM_MAX))
+            histogram = bucket["faces_histogram"]
+            histogram[histogram_key] = histogram.get(histogram_key, 0) + 1
+
+    # Merge the aggregates into the stored buckets
+    for (resolution, bucket_start), bucket in buckets.items():
+        cursor.execute(
+            "SELECT * FROM job_stats WHERE resolution = ? AND bucket_start = ?",
+            (resolution, bucket_start),
+        )
+        existing = cursor.fetchone()
+
+        if existing:
+            bucket["jobs"] += existing["jobs"]
+            bucket["faces"] += existing["faces"]
+            bucket["zero_face_jobs"] += existing["zero_face_jobs"]
+            bucket["max_faces"] = max(bucket["max_faces"], existing["max_faces"])
+            bucket["total_processing_ms"] += existing["total_processing_ms"]
+            sketch_merge(
+                bucket["latency_sketch"], sketch_loads(existing["latency_sketch"])
+            )
+            sketch_merge(
+                bucket["faces_histogram"], sketch_loads(existing["faces_histogram"])
+            )
+
+        cursor.execute(
+            "INSERT OR REPLACE INTO job_stats (resolution, bucket_start, jobs, faces, zero_face_jobs, max_faces, total_processing_ms, latency_sketch, faces_histogram) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                resolution,
+                bucket_start,
+                bucket["jobs"],
+                bucket["faces"],
+                bucket["zero_face_jobs"],
+                bucket["max_faces"],
+                bucket["total_processing_ms"],
+                json.dumps(bucket["latency_sketch"]),
+                json.dumps(bucket["faces_histogram"]),
+            ),
+        )
+
+
+def get_stats(resolution="hour", since=None, until=None):
+    """
+    Retrieve job statistics from the rollup tables.
+
+    The cost depends only on the number of buckets in the time range, not on
+    the number of jobs, and the rollups are kept after the jobs expire.
+
+    Args:
+        resolution (str): Bucket size, "minute" or "hour"
+        since (int): Start of the time range as a Unix timestamp
+            (default: 24 hours before until)
+        until (int): End of the time range as a Unix timestamp
+            (default: now)
+
+    Returns:
+        dict: Statistics per bucket and for the whole time range
+
+    Raises:
+        ValueError: If the resolution is not supported
+    """
+    if resolution not in STATS_RESOLUTIONS:
+        raise ValueError(
+            f"Invalid resolution, expected one of {', '.join(STATS_RESOLUTIONS)}"
+        )
+
+    until = int(until) if until is not None else int(time.time())
+    since = int(since) if since is not None else until - 86400
+    size = STATS_RESOLUTIONS[resolution]
+
+    # Create a new cursor for this operation
+    cursor = db_connection.cursor()
+
+    cursor.execute(
+        "SELECT * FROM job_stats WHERE resolution = ? AND bucket_start >= ? AND bucket_start <= ? ORDER BY bucket_start",
+        (resolution, since - since % size, until),
+    )
+    rows = cursor.fetchall()
+
+    # Close cursor
+    cursor.close()
+
+    buckets = []
+    summary_sketch = {}
+    summary_histogram = {}
+    summary = {
+        "jobs": 0,
+        "faces": 0,
+        "zero_face_jobs": 0,
+        "max_faces": 0,
+        "total_processing_ms": 0.0,
+    }
+
+    for row in rows:
+        latency_sketch = sketch_loads(row["latency_sketch"])
+        faces_histogram = sketch_loads(row["faces_histogram"])
+
+        buckets.append(
+            {
+                "bucket_start": row["bucket_start"],
+                "jobs": row["jobs"],
+                "faces": row["faces"],
+                "avg_faces": round(row["faces"] / row["jobs"], 3) if row["jobs"] else 0,
+                "zero_face_jobs": row["zero_face_jobs"],
+                "max_faces": row["max_faces"],
+                "processing_time": _latency_summary(
+                    latency_sketch, row["total_processing_ms"]
+                ),
+            }
+        )
+
+        summary["jobs"] += row["jobs"]
+        summary["faces"] += row["faces"]
+        summary["zero_face_jobs"] += row["zero_face_jobs"]
+        summary["max_faces"] = max(summary["max_faces"], row["max_faces"])
+        summary["total_processing_ms"] += row["total_processing_ms"]
+        sketch_merge(summary_sketch, latency_sketch)
+        sketch_merge(summary_histogram, faces_histogram)
+
+    total_processing_ms = summary.pop("total_processing_ms")
+    summary["avg_faces"] = (
+        round(summary["faces"] / summary["jobs"], 3) if summary["jobs"] else 0
+    )
+    summary["faces_histogram"] = {
+        key: summary_histogram[key] for key in sorted(summary_histogram, key=int)
+    }
+    summary["processing_time"] = _latency_summary(summary_sketch, total_processing_ms)
+
+    return {
+        "resolution": resolution,
+        "since": since,
+        "until": until,
+        "summary": summary,
+        "buckets": buckets,
+    }
+
+
+def _latency_summary(latency_sketch, total_processing_ms):
+    """
+    Summarize processing times from a latency sketch.
+
+    Args:
+        latency_sketch (dict): Sketch of processing times
+        total_processing_ms (float): Sum of the processing times
+
+    Returns:
+        dict: Mean and percentile processing times in milliseconds
+    """
+    count = sketch_count(latency_sketch)
+
+    return {
+        "mean_ms": round(total_processing_ms / count, 2) if count else None,
+        **sketch_summary(latency_sketch),
+    }
+
+
+def cleanup_expired_stats(minute_retention, hour_retention):
+    """
+    Clean up statistics rollup buckets older than their retention.
+
+    Args:
+        minute_retention (int): Time in seconds to keep per-minute buckets
+        hour_retention (int): Time in seconds to keep per-hour buckets
+    """
+    try:
+        now = int(time.time())
+
+        with db_write_lock:
+            # Create a new cursor for this operation
+            cursor = db_connection.cursor()
+
+            try:
+                for resolution, retention in (
+                    ("minute", minute_retention),
+                    ("hour", hour_retention),
+                ):
+                    cursor.execute(
+                        "DELETE FROM job_stats WHERE resolution = ? AND bucket_start < ?",
+                        (resolution, now - retention),
+                    )
+                db_connection.commit()
+            except Exception:
+                db_connection.rollback()
+                raise
+            finally:
+                # Close cursor
+                cursor.close()
+    except Exception as e:
+        print(f"Error in cleanup_expired_stats: {e}")
 
 
 def cleanup_expired_jobs(expire_after):
@@ -87,15 +684,29 @@ def cleanup_expired_jobs(expire_after):
         # Calculate expiration timestamp
         expiration_time = int(time.time()) - expire_after
 
-        # Create a new cursor for this operation
-        cursor = db_connection.cursor()
+        with db_write_lock:
+            # Create a new cursor for this operation
+            cursor = db_connection.cursor()
 
-        # Get expired jobs
-        cursor.execute(
-            "SELECT job_id, result_image_path FROM jobs WHERE created_at < ?",
-            (expiration_time,),
-        )
-        expired_jobs = cursor.fetchall()
+            try:
+                # Get expired jobs
+                cursor.execute(
+                    "SELECT job_id, result_image_path FROM jobs WHERE created_at < ?",
+                    (expiration_time,),
+                )
+                expired_jobs = cursor.fetchall()
+
+                # Delete expired jobs from database
+                cursor.execute(
+                    "DELETE FROM jobs WHERE created_at < ?", (expiration_time,)
+                )
+                db_connection.commit()
+            except Exception:
+                db_connection.rollback()
+                raise
+            finally:
+                # Close cursor
+                cursor.close()
 
         # Delete files associated with expired jobs
         for job in expired_jobs:
@@ -105,12 +716,12 @@ def cleanup_expired_jobs(expire_after):
                 except OSError as e:
                     print(f"Error deleting image file: {e}")
 
-        # Delete expired jobs from database
-        cursor.execute("DELETE FROM jobs WHERE created_at < ?", (expiration_time,))
-        db_connection.commit()
-
-        # Close cursor
-        cursor.close()
+        # Evict expired jobs from the caches, including jobs deleted by other
+        # worker processes
+        expired_ids = [job["job_id"] for job in expired_jobs]
+        for cache in (job_cache, image_cache):
+            cache.discard(expired_ids)
+            cache.discard_older_than(expiration_time)
     except Exception as e:
         print(f"Error in cleanup_expired_jobs: {e}")
 
@@ -129,52 +740,163 @@ def save_job(job_id, result_image_bytes, processing_time, result_data):
         dict: Job data including URLs and processing information
     """
     try:
-        # Create a new cursor for this operation
-        cursor = db_connection.cursor()
+        job = _build_job(job_id, result_image_bytes, processing_time, result_data)
 
-        # Create job directory
-        job_dir = os.path.join(image_storage_path, job_id)
-        if not os.path.exists(job_dir):
-            os.makedirs(job_dir)
+        # Hand the job to the background writer, or write it immediately if
+        # the writer is stopped or falling behind
+        if not (write_behind_enabled and _enqueue_job(job)):
+            _write_jobs(db_connection, [job])
 
-        # Save image to file
-        image_path = os.path.join(job_dir, "result_image.png")
-        with open(image_path, "wb") as f:
-            f.write(result_image_bytes)
-
-        # Create job data
-        job_data = {
-            "job_id": job_id,
-            "result_image_url": f"/jobs/{job_id}/result_image.png",
-            "processing_time": processing_time,
-            "result_data": result_data,
-        }
+        # Clients usually poll a new job right away
+        _cache_job(job)
 
-        # Insert job data into database
-        cursor.execute(
-            "INSERT INTO jobs (job_id, result_image_path, processing_time, result_data, created_at) VALUES (?, ?, ?, ?, ?)",
-            (
-                job_id,
-                image_path,
-                processing_time,
-                json.dumps(result_data),
-                int(time.time()),
-            ),
-        )
-        db_connection.commit()
+        return job["job_data"]
+    except Exception as e:
+        print(f"Error in save_job: {e}")
+        raise
 
-        # Close cursor
-        cursor.close()
 
-        return job_data
+def save_jobs(jobs):
+    """
+    Save several jobs in a single transaction.
+
+    Args:
+        jobs (list): (job_id, result_image_bytes, processing_time,
+            result_data) tuples
+
+    Returns:
+        list: Job data for each saved job
+    """
+    try:
+        built_jobs = [_build_job(*job) for job in jobs]
+        _write_jobs(db_connection, built_jobs)
+
+        return [job["job_data"] for job in built_jobs]
     except Exception as e:
-        print(f"Error in save_job: {e}")
+        print(f"Error in save_jobs: {e}")
         raise
 
 
+def _build_job(job_id, result_image_bytes, processing_time, result_data):
+    """
+    Build the row and response data for a completed job.
+
+    Args:
+        job_id (str): Unique job identifier
+        result_image_bytes (bytes): Processed image data
+        processing_time (str): Processing time in milliseconds
+        result_data (list): Data about detected faces
+
+    Returns:
+        dict: Job row, result image and job data
+    """
+    # Create job data
+    job_data = {
+        "job_id": job_id,
+        "result_image_url": f"/jobs/{job_id}/result_image.png",
+        "processing_time": processing_time,
+        "result_data": result_data,
+    }
+
+    return {
+        "job_id": job_id,
+        "image": result_image_bytes,
+        "processing_time": processing_time,
+        "result_data": json.dumps(result_data),
+        "face_count": len(result_data),
+        "created_at": int(time.time()),
+        "job_data": job_data,
+    }
+
+
+def _cache_job(job):
+    """
+    Add a saved job and its result image to the caches.
+
+    Args:
+        job (dict): Job row, result image and job data
+    """
+    job_cache.put(
+        job["job_id"],
+        {**job["job_data"], "created_at": job["created_at"]},
+        job_entry_size(job["result_data"]),
+        job["created_at"],
+    )
+    image_cache.put(job["job_id"], job["image"], len(job["image"]), job["created_at"])
+
+
+def get_existing_job_ids(job_ids):
+    """
+    Find which of the given jobs are already stored in the database.
+
+    Args:
+        job_ids (list): Job identifiers to look up
+
+    Returns:
+        set: Job identifiers that exist
+    """
+    existing = set()
+    job_ids = list(job_ids)
+
+    # Create a new cursor for this operation
+    cursor = db_connection.cursor()
+
+    # Query in chunks to stay below the SQLite parameter limit
+    for start in range(0, len(job_ids), 500):
+        chunk = job_ids[start : start + 500]
+        placeholders = ", ".join("?" for _ in chunk)
+        cursor.execute(
+            f"SELECT job_id FROM jobs WHERE job_id IN ({placeholders})", chunk
+        )
+        existing.update(row["job_id"] for row in cursor.fetchall())
+
+    # Close cursor
+    cursor.close()
+
+    return existing
+
+
+def get_cached_job(job_id):
+    """
+    Retrieve job data if it is held in memory.
+
+    Args:
+        job_id (str): Unique job identifier
+
+    Returns:
+        dict: Job data or None if the job is not pending or cached
+    """
+    # Serve jobs that have not been flushed yet from memory
+    with pending_condition:
+        job = pending_jobs.get(job_id)
+
+    if job:
+        return {**job["job_data"], "created_at": job["created_at"]}
+
+    # Then recently used jobs
+    cached = job_cache.get(job_id)
+    if cached:
+        return dict(cached)
+
+    return None
+
+
 def get_job(job_id):
     """
-    Retrieve job data from the database.
+    Retrieve job data from memory or the database.
+
+    Args:
+        job_id (str): Unique job identifier
+
+    Returns:
+        dict: Job data or None if not found
+    """
+    return get_cached_job(job_id) or load_job(job_id)
+
+
+def load_job(job_id):
+    """
+    Retrieve job data from the database and add it to the cache.
 
     Args:
         job_id (str): Unique job identifier
@@ -205,14 +927,41 @@ def get_job(job_id):
                 "result_data": result_data,
                 "created_at": job_data["created_at"],
             }
-            return response_data
+            job_cache.put(
+                job_id,
+                response_data,
+                job_entry_size(job_data["result_data"]),
+                job_data["created_at"],
+            )
+            return dict(response_data)
 
         return None
     except Exception as e:
-        print(f"Error in get_job: {e}")
+        print(f"Error in load_job: {e}")
         return None
 
 
+def get_cached_result_image(job_id):
+    """
+    Retrieve the processed image for a job if it is held in memory.
+
+    Args:
+        job_id (str): Unique job identifier
+
+    Returns:
+        bytes: Image data or None if the image is not pending or cached
+    """
+    # Serve images that have not been flushed yet from memory
+    with pending_condition:
+        job = pending_jobs.get(job_id)
+
+    if job:
+        return job["image"]
+
+    # Then recently used images
+    return image_cache.get(job_id)
+
+
 def get_result_image(job_id):
     """
     Retrieve the processed image for a job.
@@ -224,10 +973,17 @@ def get_result_image(job_id):
         bytes: Image data or None if not found
     """
     try:
+        image = get_cached_result_image(job_id)
+        if image:
+            return image
+
         # Create a new cursor for this operation
         cursor = db_connection.cursor()
 
-        cursor.execute("SELECT result_image_path FROM jobs WHERE job_id = ?", (job_id,))
+        cursor.execute(
+            "SELECT result_image_path, created_at FROM jobs WHERE job_id = ?",
+            (job_id,),
+        )
         job = cursor.fetchone()
 
         # Close cursor
@@ -239,7 +995,9 @@ def get_result_image(job_id):
             and os.path.exists(job["result_image_path"])
         ):
             with open(job["result_image_path"], "rb") as f:
-                return f.read()
+                image = f.read()
+            image_cache.put(job_id, image, len(image), job["created_at"])
+            return image
 
         return None
     except Exception as e:
@@ -247,6 +1005,39 @@ def get_result_image(job_id):
         return None
 
 
+def get_result_image_path(job_id):
+    """
+    Retrieve the file path of the processed image for a job.
+
+    Args:
+        job_id (str): Unique job identifier
+
+    Returns:
+        str: Path to the image file or None if not found
+    """
+    try:
+        # Create a new cursor for this operation
+        cursor = db_connection.cursor()
+
+        cursor.execute("SELECT result_image_path FROM jobs WHERE job_id = ?", (job_id,))
+        job = cursor.fetchone()
+
+        # Close cursor
+        cursor.close()
+
+        if (
+            job
+            and job["result_image_path"]
+            and os.path.exists(job["result_image_path"])
+        ):
+            return job["result_image_path"]
+
+        return None
+    except Exception as e:
+        print(f"Error in get_result_image_path: {e}")
+        return None
+
+
 def get_recent_jobs(page=1, limit=10):
     """
     Retrieve a list of recent jobs with pagination.
@@ -7,28 +7,423 @@ It provides functions for processing images and extracting facial features.
 
 import cv2
 import dlib
+import multiprocessing
 import numpy as np
 import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from app.helpers.batch_scheduler import MicroBatcher
+from app.helpers.latency_model import (
+    PREVIEW_SCALE,
+    plan_processing,
+    record_timings,
+)
+from app.helpers.memory_budget import (
+    inspect_upload,
+    read_upload,
+    estimate_peak_bytes,
+    reserve_memory,
+)
 
 # Initialize face detector and facial landmark predictor
 detector = None
 predictor = None
 
+# Tiled detection settings
+tile_threshold = 0
+tile_size = 1536
+tile_overlap = 256
+tile_workers = 1
+tile_pool = None
+
+# Boxes overlapping more than this (intersection over union) are merged
+NMS_IOU_THRESHOLD = 0.4
+
+# Detector used inside tile worker processes
+worker_detector = None
+
+# Number of times the HOG detector upsamples images at full quality
+detector_upsample = 0
+
+# CNN detector backend
+cnn_detector = None
+cnn_upsample = 0
+cnn_batcher = None
+
 
-def init_face_detector(predictor_path):
+class ImageDecodeError(ValueError):
+    """Raised when an uploaded file cannot be decoded as an image."""
+
+
+def init_face_detector(
+    predictor_path,
+    tiled_threshold=0,
+    tiled_size=1536,
+    tiled_overlap=256,
+    tiled_workers=None,
+    backend="hog",
+    cnn_model_path=None,
+    cnn_batch_size=8,
+    cnn_batch_wait_ms=5,
+    cnn_upsample_times=0,
+    upsample_times=0,
+):
     """
     Initialize the face detector and facial landmark predictor.
 
     Args:
         predictor_path (str): Path to the shape predictor file
+        tiled_threshold (int): Pixel count above which tiled detection is
+            used (0 disables tiled detection)
+        tiled_size (int): Width and height of each detection tile in pixels
+        tiled_overlap (int): Overlap between neighbouring tiles in pixels
+        tiled_workers (int): Number of worker processes for tiled detection
+            (defaults to the number of CPU cores, 1 runs tiles in-process)
+        backend (str): Face detector to use, "hog" or "cnn"
+        cnn_model_path (str): Path to the CNN face detector model file
+        cnn_batch_size (int): Maximum number of images per CNN batch
+        cnn_batch_wait_ms (float): Maximum time a request waits for a CNN
+            batch to fill up, in milliseconds
+        cnn_upsample_times (int): Number of times the CNN detector upsamples
+            images to find smaller faces
+        upsample_times (int): Number of times the HOG detector upsamples
+            images to find smaller faces
     """
-    global detector, predictor
+    global detector, predictor, detector_upsample
+    global tile_threshold, tile_size, tile_overlap, tile_workers
+    global cnn_detector, cnn_upsample, cnn_batcher
+
+    if backend not in ("hog", "cnn"):
+        raise ValueError(f"Unknown face detector backend: {backend}")
+
+    if tiled_overlap >= tiled_size:
+        raise ValueError("Tile overlap must be smaller than the tile size")
+
+    tile_threshold = max(0, int(tiled_threshold))
+    tile_size = int(tiled_size)
+    tile_overlap = int(tiled_overlap)
+    tile_workers = max(1, int(tiled_workers or os.cpu_count() or 1))
+
+    # Fork the HOG tile workers before the models are loaded; the CNN
+    # backend batches tiles in-process instead
+    _start_tile_pool(backend == "hog" and tile_threshold and tile_workers > 1)
 
     detector = dlib.get_frontal_face_detector()
     predictor = dlib.shape_predictor(predictor_path)
+    detector_upsample = max(0, int(upsample_times))
+
+    if cnn_batcher is not None:
+        cnn_batcher.close()
+        cnn_batcher = None
+
+    if backend == "cnn":
+        cnn_detector = dlib.cnn_face_detection_model_v1(cnn_model_path)
+        cnn_upsample = int(cnn_upsample_times)
+        cnn_batcher = MicroBatcher(
+            _detect_cnn_batch,
+            max_batch_size=cnn_batch_size,
+            max_wait_ms=cnn_batch_wait_ms,
+        )
+
+
+def _init_tile_worker():
+    """Create a face detector inside a tile worker process."""
+    global worker_detector
+
+    worker_detector = dlib.get_frontal_face_detector()
+
+
+def _start_tile_pool(enabled):
+    """
+    Start the process pool used for tiled detection.
+
+    The workers are forked right away, while the application is starting
+    and before any other threads exist, so they neither inherit locks held
+    by other threads nor import the application entry point again as
+    spawned workers would.
+
+    Args:
+        enabled (bool): Whether tiles are processed in worker processes
+    """
+    global tile_pool
+
+    if tile_pool is not None:
+        tile_pool.shutdown()
+        tile_pool = None
+
+    if not enabled:
+        return
+
+    # Spawning is the fallback on platforms without fork
+    methods = multiprocessing.get_all_start_methods()
+    tile_pool = ProcessPoolExecutor(
+        max_workers=tile_workers,
+        mp_context=multiprocessing.get_context(
+            "fork" if "fork" in methods else "spawn"
+        ),
+        initializer=_init_tile_worker,
+    )
+
+    # Fork all workers now instead of on the first large image
+    tile_pool.submit(int).result()
+
+
+def _map_detections(detections, offset_x, offset_y, scale):
+    """
+    Map detections from a tile or scaled frame to full image coordinates.
+
+    Args:
+        detections (list): Detections as (left, top, right, bottom, score)
+        offset_x (int): X offset of the tile in the full image
+        offset_y (int): Y offset of the tile in the full image
+        scale (float): Scale of the tile relative to the full image
+
+    Returns:
+        list: Detections in the coordinates of the full image
+    """
+    return [
+        (
+            int(left / scale) + offset_x,
+            int(top / scale) + offset_y,
+            int(right / scale) + offset_x,
+            int(bottom / scale) + offset_y,
+            score,
+        )
+        for left, top, right, bottom, score in detections
+    ]
+
+
+def _to_rectangles(detections):
+    """
+    Convert detections to dlib rectangles for the landmark predictor.
+
+    Args:
+        detections (list): Detections as (left, top, right, bottom, score)
 
+    Returns:
+        dlib.rectangles: Face rectangles
+    """
+    faces = dlib.rectangles()
+    for left, top, right, bottom, _ in detections:
+        faces.append(dlib.rectangle(left, top, right, bottom))
+
+    return faces
+
+
+def _detect_tile(task):
+    """
+    Run the face detector on a single tile.
+
+    Args:
+        task (tuple): Tile image, x offset, y offset, scale factor and
+            number of times to upsample the tile
+
+    Returns:
+        list: Detections as (left, top, right, bottom, score) tuples in the
+            coordinates of the full image
+    """
+    tile, offset_x, offset_y, scale, upsample = task
+    tile_detector = worker_detector or detector
 
-def process_image(image):
+    rects, scores, _ = tile_detector.run(tile, upsample, 0)
+    detections = [
+        (rect.left(), rect.top(), rect.right(), rect.bottom(), score)
+        for rect, score in zip(rects, scores)
+    ]
+
+    return _map_detections(detections, offset_x, offset_y, scale)
+
+
+def _detect_cnn_batch(images):
+    """
+    Run the CNN face detector on a batch of equally sized images.
+
+    Args:
+        images (list): Images of the same size
+
+    Returns:
+        list: Detections as (left, top, right, bottom, score) tuples for
+            each image
+    """
+    results = cnn_detector(images, cnn_upsample, batch_size=len(images))
+
+    return [
+        [
+            (
+                detection.rect.left(),
+                detection.rect.top(),
+                detection.rect.right(),
+                detection.rect.bottom(),
+                detection.confidence,
+            )
+            for detection in detections
+        ]
+        for detections in results
+    ]
+
+
+def _tile_origins(length):
+    """
+    Calculate the start positions of tiles along one image axis.
+
+    Args:
+        length (int): Length of the axis in pixels
+
+    Returns:
+        list: Tile start positions, the last tile being aligned to the edge
+    """
+    if length <= tile_size:
+        return [0]
+
+    step = tile_size - tile_overlap
+    origins = list(range(0, length - tile_size, step))
+    origins.append(length - tile_size)
+    return origins
+
+
+def _non_max_suppression(detections):
+    """
+    Merge overlapping detections, keeping the highest scoring box.
+
+    Args:
+        detections (list): Detections as (left, top, right, bottom, score)
+
+    Returns:
+        list: Remaining detections, highest score first
+    """
+    kept = []
+
+    for box in sorted(detections, key=lambda d: d[4], reverse=True):
+        left, top, right, bottom, _ = box
+        area = (right - left + 1) * (bottom - top + 1)
+        suppressed = False
+
+        for other in kept:
+            inter_w = min(right, other[2]) - max(left, other[0]) + 1
+            inter_h = min(bottom, other[3]) - max(top, other[1]) + 1
+            if inter_w <= 0 or inter_h <= 0:
+                continue
+
+            intersection = inter_w * inter_h
+            other_area = (other[2] - other[0] + 1) * (other[3] - other[1] + 1)
+            union = area + other_area - intersection
+            if intersection / union > NMS_IOU_THRESHOLD:
+                suppressed = True
+                break
+
+        if not suppressed:
+            kept.append(box)
+
+    return kept
+
+
+def detect_faces_tiled(gray, upsample=0):
+    """
+    Detect faces by splitting the image into overlapping tiles.
+
+    Tiles are processed in parallel across the tile worker processes, or in
+    shared batches with the CNN backend. A downscaled pass over the whole
+    frame is added so that faces larger than the tile overlap are still
+    found, and the detections of all passes are merged with non-maximum
+    suppression.
+
+    Args:
+        gray (numpy.ndarray): Grayscale image
+        upsample (int): Number of times the HOG detector upsamples each tile
+
+    Returns:
+        dlib.rectangles: Detected face rectangles
+    """
+    height, width = gray.shape[:2]
+
+    tasks = []
+    for y in _tile_origins(height):
+        for x in _tile_origins(width):
+            tile = np.ascontiguousarray(gray[y : y + tile_size, x : x + tile_size])
+            tasks.append((tile, x, y, 1.0, upsample))
+
+    # Coarse pass over the whole frame for faces that do not fit in a tile
+    scale = tile_size / max(height, width)
+    if scale < 1.0:
+        coarse = cv2.resize(
+            gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA
+        )
+        tasks.append((coarse, 0, 0, scale, upsample))
+
+    if cnn_batcher is not None:
+        # Equally sized tiles share CNN batches
+        futures = [
+            (cnn_batcher.submit(tile), x, y, tile_scale)
+            for tile, x, y, tile_scale, _ in tasks
+        ]
+        results = [
+            _map_detections(future.result(), x, y, tile_scale)
+            for future, x, y, tile_scale in futures
+        ]
+    elif tile_pool is not None:
+        results = tile_pool.map(_detect_tile, tasks)
+    else:
+        results = map(_detect_tile, tasks)
+
+    detections = [detection for result in results for detection in result]
+
+    return _to_rectangles(_non_max_suppression(detections))
+
+
+def get_detector_stats():
+    """
+    Get statistics about the face detector backend.
+
+    Returns:
+        dict: Backend name and CNN batching counters
+    """
+    if cnn_batcher is None:
+        return {"backend": "hog"}
+
+    batches = cnn_batcher.stats["batches"]
+    images = cnn_batcher.stats["images"]
+
+    return {
+        "backend": "cnn",
+        "batches": batches,
+        "images": images,
+        "avg_batch_size": round(images / batches, 2) if batches else 0.0,
+    }
+
+
+def detect_faces(gray, upsample=None):
+    """
+    Detect faces in a grayscale image.
+
+    Images larger than the tiled detection threshold are processed with
+    tiled detection, everything else with a single detector call. With the
+    CNN backend, the call is batched with concurrent requests by the
+    micro-batching scheduler.
+
+    Args:
+        gray (numpy.ndarray): Grayscale image
+        upsample (int): Number of times the HOG detector upsamples the image
+            (defaults to the configured detector upsampling). The CNN
+            detector always uses its configured upsampling, as requests in
+            a batch share one detector call.
+
+    Returns:
+        dlib.rectangles: Detected face rectangles
+    """
+    if upsample is None:
+        upsample = detector_upsample
+
+    if tile_threshold and gray.shape[0] * gray.shape[1] > tile_threshold:
+        return detect_faces_tiled(gray, upsample)
+
+    if cnn_batcher is not None:
+        return _to_rectangles(cnn_batcher.detect(gray))
+
+    return detector(gray, upsample)
+
+
+def process_image(image, options=None, timings=None):
     """
     Process an image to detect faces and extract facial landmarks.
 
@@ -36,8 +431,15 @@ def process_image(image):
     and adds visual markers for key facial features. It returns the processed
     image and data about the detected features.
 
+    Faces can be detected on a downscaled copy of the image to save time,
+    landmarks are always extracted at full resolution.
+
     Args:
         image (numpy.ndarray): The image to process
+        options (dict): Optional detection scale and detector upsampling, as
+            returned by plan_processing
+        timings (dict): Optional dictionary that receives the duration of
+            detection and landmarking in milliseconds
 
     Returns:
         tuple: A tuple containing:
@@ -49,11 +451,34 @@ def process_image(image):
             "Face detector not initialized. Call init_face_detector first."
         )
 
+    if options is None:
+        options = {}
+    if timings is None:
+        timings = {}
+
+    stage_start = time.perf_counter()
+
     # Convert the image to grayscale for face detection
     gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
 
-    # Detect faces in the frame
-    faces = detector(gray)
+    # Detect faces in the frame, downscaled if the deadline requires it
+    scale = options.get("detection_scale", 1.0)
+    upsample = options.get("upsample")
+    if scale < 1.0:
+        small = cv2.resize(
+            gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA
+        )
+        detections = [
+            (face.left(), face.top(), face.right(), face.bottom(), 0.0)
+            for face in detect_faces(small, upsample)
+        ]
+        del small
+        faces = _to_rectangles(_map_detections(detections, 0, 0, scale))
+    else:
+        faces = detect_faces(gray, upsample)
+
+    timings["detect"] = (time.perf_counter() - stage_start) * 1000
+    stage_start = time.perf_counter()
 
     result_data = []
 
@@ -121,4 +546,129 @@ def process_image(image):
             }
         )
 
+    timings["landmarks"] = (time.perf_counter() - stage_start) * 1000
+
     return image, result_data
+
+
+def process_upload(stream, timings=None, deadline=None, quality=None):
+    """
+    Decode an uploaded image, process it and encode the result as PNG.
+
+    Memory for the whole pipeline is reserved from the memory budget before
+    the image is decoded. When a deadline is given, the detection scale,
+    detector upsampling and rendering mode are lowered as far as the learned
+    latency estimates say is needed to finish in time.
+
+    Args:
+        stream: Seekable file object holding the uploaded image
+        timings (dict): Optional dictionary that receives the duration of
+            each stage in milliseconds
+        deadline (float): Optional time.monotonic() timestamp by which the
+            image should be processed
+        quality (dict): Optional dictionary that receives the processing
+            plan, including the degradations applied, when a deadline is
+            given
+
+    Returns:
+        tuple: A tuple containing:
+            - bytes: The processed image encoded as PNG
+            - list: Data about the detected facial features
+
+    Raises:
+        ImageDecodeError: If the upload cannot be decoded as an image
+        MemoryBudgetExceeded: If memory for the image could not be reserved
+    """
+    if timings is None:
+        timings = {}
+
+    # Estimate the peak memory needed from the image header
+    header, upload_size = inspect_upload(stream)
+    peak_bytes = estimate_peak_bytes(header, upload_size)
+
+    # The CNN detector's upsampling is fixed for the whole batch
+    base_upsample = 0 if cnn_batcher is not None else detector_upsample
+    options = {
+        "detection_scale": 1.0,
+        "upsample": base_upsample,
+        "render_mode": "full",
+    }
+
+    stage_start = time.perf_counter()
+
+    with reserve_memory(peak_bytes):
+        timings["memory_wait"] = (time.perf_counter() - stage_start) * 1000
+        stage_start = time.perf_counter()
+
+        # Convert image file to numpy array
+        image_np = read_upload(stream, upload_size)
+        image = cv2.imdecode(image_np, cv2.IMREAD_COLOR)
+        del image_np
+
+        if image is None:
+            raise ImageDecodeError("Unable to decode image")
+
+        height, width = image.shape[:2]
+
+        timings["decode"] = (time.perf_counter() - stage_start) * 1000
+
+        # Plan from the decoded size, which is known for every image format,
+        # with the time left until the deadline
+        if deadline is not None:
+            options = plan_processing(
+                width,
+                height,
+                (deadline - time.monotonic()) * 1000,
+                base_upsample,
+                include_decode=False,
+            )
+
+        stage_start = time.perf_counter()
+
+        # Process the image
+        result_image, result_data = process_image(image, options, timings)
+        del image
+
+        timings["process"] = (time.perf_counter() - stage_start) * 1000
+        stage_start = time.perf_counter()
+
+        # Convert the result image to bytes, faster and smaller if degraded
+        encode_params = []
+        if options["render_mode"] == "preview":
+            result_image = cv2.resize(
+                result_image,
+                None,
+                fx=PREVIEW_SCALE,
+                fy=PREVIEW_SCALE,
+                interpolation=cv2.INTER_AREA,
+            )
+        if options["render_mode"] != "full":
+            encode_params = [cv2.IMWRITE_PNG_COMPRESSION, 0]
+
+        _, result_image_png = cv2.imencode(".png", result_image, encode_params)
+        del result_image
+        result_image_bytes = result_image_png.tobytes()
+
+        timings["encode"] = (time.perf_counter() - stage_start) * 1000
+
+    record_timings(width, height, options, len(result_data), timings)
+
+    if quality is not None and deadline is not None:
+        quality.update(options)
+
+    return result_image_bytes, result_data
+
+
+def format_server_timing(timings):
+    """
+    Format stage durations as a Server-Timing header value.
+
+    Args:
+        timings (dict): Stage durations in milliseconds
+
+    Returns:
+        str: Header value such as "decode;dur=1.20, process;dur=35.81"
+    """
+    return ", ".join(
+        f"{stage};dur={duration:.2f}" for stage, duration in timings.items()
+    )
@@ -0,0 +1,209 @@
+"""
+Latency model module
+
+This module learns how long each processing stage takes from recent
+requests, grouped by image size, and uses those estimates to pick the
+processing quality that fits a request's deadline.
+"""
+
+import math
+import threading
+
+# Weight of the newest observation in the moving averages
+EWMA_ALPHA = 0.2
+
+# Detection scales and rendering modes, best quality first
+DETECTION_SCALES = (1.0, 0.75, 0.5, 0.35, 0.25)
+RENDER_MODES = ("full", "fast", "preview")
+
+# Result images rendered in preview mode are downscaled by this factor
+PREVIEW_SCALE = 0.5
+
+# Images are never scaled below this many pixels on the shortest side
+MIN_DETECTION_SIDE = 160
+
+# Starting estimates before anything has been measured, in milliseconds per
+# megapixel (or per face for landmarks)
+DEFAULT_COSTS = {
+    "decode": 10.0,
+    "detect": 120.0,
+    "landmarks": 2.0,
+    "encode_full": 60.0,
+    "encode_fast": 15.0,
+}
+
+# Global variables
+costs = {}
+faces_per_image = 1.0
+model_lock = threading.Lock()
+
+
+def _size_bucket(pixels):
+    """Group image sizes in powers of two, starting at 256x256."""
+    return max(0, int(math.log2(max(pixels, 1) / 65536)))
+
+
+def _cost(stage, bucket):
+    """Get the learned cost of a stage, falling back to all image sizes."""
+    for key in ((stage, bucket), (stage, None)):
+        if key in costs:
+            return costs[key]
+
+    return DEFAULT_COSTS[stage]
+
+
+def _update(stage, bucket, value):
+    """Fold an observed cost into the moving averages."""
+    for key in ((stage, bucket), (stage, None)):
+        previous = costs.get(key)
+        costs[key] = (
+            value if previous is None else previous + EWMA_ALPHA * (value - previous)
+        )
+
+
+def _encode_stage(render_mode):
+    """Get the cost stage used by a rendering mode."""
+    return "encode_full" if render_mode == "full" else "encode_fast"
+
+
+def _encoded_pixels(pixels, render_mode):
+    """Get the number of pixels encoded by a rendering mode."""
+    if render_mode == "preview":
+        return pixels * PREVIEW_SCALE**2
+    return pixels
+
+
+def estimate_ms(
+    width, height, detection_scale, upsample, render_mode, include_decode=True
+):
+    """
+    Estimate the processing time of an image.
+
+    Args:
+        width (int): Image width
+        height (int): Image height
+        detection_scale (float): Scale the image is detected at
+        upsample (int): Number of times the detector upsamples the image
+        render_mode (str): Rendering mode of the result image
+        include_decode (bool): Whether decoding is part of the estimate
+
+    Returns:
+        float: Estimated processing time in milliseconds
+    """
+    pixels = width * height
+    megapixels = pixels / 1e6
+    detect_megapixels = megapixels * detection_scale**2 * 4**upsample
+    bucket = _size_bucket(pixels)
+
+    with model_lock:
+        decode_ms = _cost("decode", bucket) * megapixels if include_decode else 0
+        return (
+            decode_ms
+            + _cost("detect", bucket) * detect_megapixels
+            + _cost("landmarks", bucket) * faces_per_image
+            + _cost(_encode_stage(render_mode), bucket)
+            * _encoded_pixels(pixels, render_mode)
+            / 1e6
+        )
+
+
+def plan_processing(
+    width, height, deadline_ms, base_upsample=0, include_decode=True
+):
+    """
+    Pick the best processing quality expected to finish within a deadline.
+
+    Rendering is degraded first, then detector upsampling and finally the
+    detection scale. If nothing fits, the cheapest option is used.
+
+    Args:
+        width (int): Image width
+        height (int): Image height
+        deadline_ms (float): Time left for processing in milliseconds
+        base_upsample (int): Detector upsampling used at full quality
+        include_decode (bool): Whether decoding is still to be done within
+            the deadline
+
+    Returns:
+        dict: Detection scale, upsampling, rendering mode, scale of the
+            result image, the estimate and the list of degradations applied
+    """
+    shortest = min(width, height)
+    scales = [
+        scale
+        for scale in DETECTION_SCALES
+        if scale == 1.0 or shortest * scale >= MIN_DETECTION_SIDE
+    ]
+
+    candidates = [
+        (scale, upsample, render_mode)
+        for scale in scales
+        for upsample in range(base_upsample, -1, -1)
+        for render_mode in RENDER_MODES
+    ]
+
+    for scale, upsample, render_mode in candidates:
+        estimate = estimate_ms(
+            width, height, scale, upsample, render_mode, include_decode
+        )
+        plan = {
+            "detection_scale": scale,
+            "upsample": upsample,
+            "render_mode": render_mode,
+            "result_image_scale": PREVIEW_SCALE if render_mode == "preview" else 1.0,
+            "estimated_ms": round(estimate, 2),
+        }
+        if estimate <= deadline_ms:
+            break
+
+    degradations = []
+    if plan["detection_scale"] < 1.0:
+        degradations.append(f"detection_scale:{plan['detection_scale']}")
+    if plan["upsample"] < base_upsample:
+        degradations.append(f"upsample:{plan['upsample']}")
+    if plan["render_mode"] != "full":
+        degradations.append(f"render:{plan['render_mode']}")
+
+    plan["deadline_ms"] = round(deadline_ms, 2)
+    plan["within_deadline"] = plan["estimated_ms"] <= deadline_ms
+    plan["degradations"] = degradations
+
+    return plan
+
+
+def record_timings(width, height, options, face_count, timings):
+    """
+    Learn stage costs from a processed image.
+
+    Args:
+        width (int): Image width
+        height (int): Image height
+        options (dict): Detection scale, upsampling and rendering mode used
+        face_count (int): Number of faces found
+        timings (dict): Measured stage durations in milliseconds
+    """
+    global faces_per_image
+
+    pixels = width * height
+    megapixels = pixels / 1e6
+    if not megapixels:
+        return
+
+    scale = options.get("detection_scale", 1.0)
+    upsample = options.get("upsample") or 0
+    render_mode = options.get("render_mode", "full")
+    bucket = _size_bucket(pixels)
+
+    with model_lock:
+        if "decode" in timings:
+            _update("decode", bucket, timings["decode"] / megapixels)
+        if "detect" in timings:
+            detect_megapixels = megapixels * scale**2 * 4**upsample
+            _update("detect", bucket, timings["detect"] / detect_megapixels)
+        if "landmarks" in timings and face_count:
+            _update("landmarks", bucket, timings["landmarks"] / face_count)
+        if "encode" in timings:
+            encoded = _encoded_pixels(pixels, render_mode) / 1e6
+            _update(_encode_stage(render_mode), bucket, timings["encode"] / encoded)
+
+        faces_per_image += EWMA_ALPHA * (face_count - faces_per_image)
@@ -0,0 +1,134 @@
+"""
+Latency sketch module
+
+This module implements a small mergeable quantile sketch for latencies.
+Values are counted in logarithmic buckets, so any quantile can be estimated
+within a fixed relative error and sketches from different time buckets can
+be merged by adding their counts.
+"""
+
+import json
+import math
+
+# Quantile estimates are within this relative error of the true value
+RELATIVE_ACCURACY = 0.01
+
+GAMMA = (1 + RELATIVE_ACCURACY) / (1 - RELATIVE_ACCURACY)
+LOG_GAMMA = math.log(GAMMA)
+
+# Values at or below this are counted in a single zero bucket
+MIN_VALUE = 1e-3
+ZERO_BUCKET = "0"
+
+
+def sketch_add(sketch, value, count=1):
+    """
+    Add a value to a sketch.
+
+    Args:
+        sketch (dict): Sketch to update in place
+        value (float): Value to add
+        count (int): Number of times to add the value
+    """
+    if value <= MIN_VALUE:
+        key = ZERO_BUCKET
+    else:
+        key = str(math.ceil(math.log(value) / LOG_GAMMA))
+
+    sketch[key] = sketch.get(key, 0) + count
+
+
+def sketch_merge(sketch, other):
+    """
+    Merge another sketch into a sketch.
+
+    Args:
+        sketch (dict): Sketch to update in place
+        other (dict): Sketch to merge
+    """
+    for key, count in other.items():
+        sketch[key] = sketch.get(key, 0) + count
+
+
+def sketch_count(sketch):
+    """
+    Count the values in a sketch.
+
+    Args:
+        sketch (dict): Sketch
+
+    Returns:
+        int: Number of values added to the sketch
+    """
+    return sum(sketch.values())
+
+
+def _bucket_order(key):
+    """Sort key placing the zero bucket before all other buckets."""
+    return -math.inf if key == ZERO_BUCKET else int(key)
+
+
+def sketch_quantile(sketch, quantile):
+    """
+    Estimate a quantile from a sketch.
+
+    Args:
+        sketch (dict): Sketch
+        quantile (float): Quantile between 0 and 1
+
+    Returns:
+        float: Estimated value or None if the sketch is empty
+    """
+    total = sketch_count(sketch)
+    if not total:
+        return None
+
+    rank = quantile * (total - 1)
+    seen = 0
+
+    for key in sorted(sketch, key=_bucket_order):
+        seen += sketch[key]
+        if seen > rank:
+            if key == ZERO_BUCKET:
+                return 0.0
+            return 2 * GAMMA ** int(key) / (GAMMA + 1)
+
+    return None
+
+
+def sketch_summary(sketch, quantiles=(0.5, 0.9, 0.99)):
+    """
+    Summarize a sketch as a set of quantiles.
+
+    Args:
+        sketch (dict): Sketch
+        quantiles (tuple): Quantiles to estimate
+
+    Returns:
+        dict: Estimated quantiles keyed like "p50_ms"
+    """
+    summary = {}
+
+    for quantile in quantiles:
+        value = sketch_quantile(sketch, quantile)
+        summary[f"p{quantile * 100:g}_ms"] = (
+            round(value, 2) if value is not None else None
+        )
+
+    return summary
+
+
+def sketch_loads(data):
+    """
+    Load a sketch stored as JSON.
+
+    Args:
+        data (str): JSON-encoded sketch
+
+    Returns:
+        dict: Sketch, empty if the data is missing or invalid
+    """
+    try:
+        return json.loads(data) if data else {}
+    except (json.JSONDecodeError, TypeError):
+        return {}
@@ -0,0 +1,265 @@
+"""
+Memory budget module
+
+This module implements a process-wide memory governor for image processing.
+It estimates the peak memory footprint of a request from the image header
+and makes requests wait or fails them when the budget would be exceeded.
+"""
+
+import os
+import struct
+import threading
+import time
+from contextlib import contextmanager
+
+import numpy as np
+
+# Number of header bytes needed to read the image dimensions
+HEADER_BYTES = 128 * 1024
+
+# Peak bytes held per decoded pixel: colour frame (3), grayscale copy (1),
+# detection tile copies (1) and the PNG-encoded output, once as an array and
+# once as bytes (3 each in the worst case)
+PEAK_BYTES_PER_PIXEL = 11
+
+# Decoded size relative to the upload when the dimensions cannot be read
+UNKNOWN_FORMAT_EXPANSION = 20
+
+# Global variables
+budget_bytes = 0
+wait_timeout = 10.0
+used_bytes = 0
+peak_used_bytes = 0
+waiting_requests = 0
+rejected_requests = 0
+budget_condition = threading.Condition()
+
+
+class MemoryBudgetExceeded(Exception):
+    """Raised when memory for a request could not be reserved in time."""
+
+
+class ImageTooLarge(MemoryBudgetExceeded):
+    """Raised when a single request needs more memory than the whole budget."""
+
+
+def init_memory_budget(max_bytes, timeout=10.0):
+    """
+    Configure the process-wide memory budget.
+
+    Args:
+        max_bytes (int): Total bytes available to in-flight requests
+            (0 disables the budget)
+        timeout (float): Seconds a request may wait for memory to free up
+    """
+    global budget_bytes, wait_timeout
+
+    with budget_condition:
+        budget_bytes = max(0, int(max_bytes))
+        wait_timeout = float(timeout)
+        budget_condition.notify_all()
+
+
+def read_image_size(header):
+    """
+    Read the image dimensions from the start of an encoded image.
+
+    Supports PNG, JPEG, GIF, BMP and WebP headers.
+
+    Args:
+        header (bytes): First bytes of the encoded image
+
+    Returns:
+        tuple: (width, height) or None if the dimensions cannot be read
+    """
+    try:
+        if header[:8] == b"\x89PNG\r\n\x1a\n" and header[12:16] == b"IHDR":
+            return struct.unpack(">II", header[16:24])
+
+        if header[:6] in (b"GIF87a", b"GIF89a"):
+            return struct.unpack("<HH", header[6:10])
+
+        if header[:2] == b"BM":
+            width, height = struct.unpack("<ii", header[18:26])
+            return width, abs(height)
+
+        if header[:4] == b"RIFF" and header[8:12] == b"WEBP":
+            chunk = header[12:16]
+            if chunk == b"VP8 ":
+                width, height = struct.unpack("<HH", header[26:30])
+                return width & 0x3FFF, height & 0x3FFF
+            if chunk == b"VP8L":
+                bits = int.from_bytes(header[21:25], "little")
+                return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+            if chunk == b"VP8X":
+                width = int.from_bytes(header[24:27], "little") + 1
+                height = int.from_bytes(header[27:30], "little") + 1
+                return width, height
+            return None
+
+        if header[:2] == b"\xff\xd8":
+            offset = 2
+            while offset + 9 <= len(header):
+                if header[offset] != 0xFF:
+                    return None
+                marker = header[offset + 1]
+                if marker == 0xFF:
+                    offset += 1
+                    continue
+                if marker in (0x01, 0xD8) or 0xD0 <= marker <= 0xD7:
+                    offset += 2
+                    continue
+                (length,) = struct.unpack(">H", header[offset + 2 : offset + 4])
+                # Start of frame markers, excluding DHT, JPG and DAC
+                if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+                    height, width = struct.unpack(
+                        ">HH", header[offset + 5 : offset + 9]
+                    )
+                    return width, height
+                offset += 2 + length
+    except (struct.error, IndexError):
+        pass
+
+    return None
+
+
+def estimate_peak_bytes(header, upload_size):
+    """
+    Estimate the peak memory needed to process an uploaded image.
+
+    Args:
+        header (bytes): First bytes of the encoded image
+        upload_size (int): Size of the encoded upload in bytes
+
+    Returns:
+        int: Estimated peak memory in bytes
+    """
+    size = read_image_size(header)
+
+    if size is None:
+        return upload_size * UNKNOWN_FORMAT_EXPANSION
+
+    width, height = size
+    return upload_size + width * height * PEAK_BYTES_PER_PIXEL
+
+
+def inspect_upload(stream):
+    """
+    Read the header and total size of an uploaded file without loading it.
+
+    Args:
+        stream: Seekable file object holding the upload
+
+    Returns:
+        tuple: (header bytes, upload size in bytes), the stream is rewound
+    """
+    stream.seek(0, os.SEEK_END)
+    size = stream.tell()
+    stream.seek(0)
+
+    header = stream.read(HEADER_BYTES)
+    stream.seek(0)
+
+    return header, size
+
+
+def read_upload(stream, size):
+    """
+    Read an uploaded file into a single preallocated buffer.
+
+    Reading directly into a numpy array avoids holding the upload both as
+    bytes and as an array while it is decoded.
+
+    Args:
+        stream: File object holding the upload
+        size (int): Size of the upload in bytes
+
+    Returns:
+        numpy.ndarray: Upload contents as a uint8 array
+    """
+    if not hasattr(stream, "readinto"):
+        return np.frombuffer(stream.read(), np.uint8)
+
+    buffer = np.empty(size, np.uint8)
+    view = memoryview(buffer)
+    offset = 0
+
+    while offset < size:
+        count = stream.readinto(view[offset:])
+        if not count:
+            break
+        offset += count
+
+    return buffer[:offset]
+
+
+@contextmanager
+def reserve_memory(nbytes):
+    """
+    Reserve memory from the budget for the duration of a block.
+
+    Waits for other requests to release memory if the budget is currently
+    exhausted.
+
+    Args:
+        nbytes (int): Bytes to reserve
+
+    Raises:
+        ImageTooLarge: If the request needs more than the whole budget
+        MemoryBudgetExceeded: If the memory did not free up in time
+    """
+    global used_bytes, peak_used_bytes, waiting_requests, rejected_requests
+
+    with budget_condition:
+        limit = budget_bytes
+
+        if limit:
+            if nbytes > limit:
+                rejected_requests += 1
+                raise ImageTooLarge(
+                    f"Image needs an estimated {nbytes} bytes, "
+                    f"more than the memory budget of {limit} bytes"
+                )
+
+            deadline = time.monotonic() + wait_timeout
+            waiting_requests += 1
+            try:
+                while used_bytes + nbytes > budget_bytes:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        rejected_requests += 1
+                        raise MemoryBudgetExceeded(
+                            "Server is busy processing other images, "
+                            "try again later"
+                        )
+                    budget_condition.wait(remaining)
+            finally:
+                waiting_requests -= 1
+
+        used_bytes += nbytes
+        peak_used_bytes = max(peak_used_bytes, used_bytes)
+
+    try:
+        yield
+    finally:
+        with budget_condition:
+            used_bytes -= nbytes
+            budget_condition.notify_all()
+
+
+def get_budget_usage():
+    """
+    Get the current memory budget usage.
+
+    Returns:
+        dict: Budget size, bytes in use, peak usage and request counters
+    """
+    with budget_condition:
+        return {
+            "budget_bytes": budget_bytes,
+            "used_bytes": used_bytes,
+            "peak_used_bytes": peak_used_bytes,
+            "utilization": used_bytes / budget_bytes if budget_bytes else 0.0,
+            "waiting_requests": waiting_requests,
+            "rejected_requests": rejected_requests,
+        }
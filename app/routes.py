@@ -6,23 +6,35 @@ It contains route definitions for the face detection API.
 """
 
 from flask import Blueprint, request, jsonify, send_file
-import numpy as np
-import cv2
 import uuid
 import time
 import io
 import json
+import math
 from flask_limiter.util import get_remote_address
 
 from app import limiter
-from app.helpers.image_processor import process_image
+from app.helpers.image_processor import (
+    process_upload,
+    format_server_timing,
+    get_detector_stats,
+    ImageDecodeError,
+)
+from app.helpers.memory_budget import (
+    MemoryBudgetExceeded,
+    ImageTooLarge,
+    get_budget_usage,
+)
 from app.helpers.database import (
     save_job,
     get_job,
     get_result_image,
     get_recent_jobs,
     count_jobs,
+    get_stats,
+    get_write_behind_stats,
 )
+from app.helpers.cache import get_cache_stats
 
 # Create Blueprint
 bp = Blueprint("routes", __name__)
@@ -84,6 +96,65 @@ def get_jobs_api():
         return jsonify({"error": str(e)}), 500
 
 
+@bp.route("/api/stats", methods=["GET"])
+@limiter.exempt
+def get_stats_api():
+    """
+    Retrieve job and processing time statistics.
+
+    Query parameters:
+        resolution (str): Bucket size, "minute" or "hour" (default: hour)
+        since (int): Start of the time range as a Unix timestamp
+            (default: 24 hours before until)
+        until (int): End of the time range as a Unix timestamp (default: now)
+
+    Returns:
+        JSON: Statistics per bucket and for the whole time range
+    """
+    try:
+        resolution = request.args.get("resolution", "hour")
+        since = request.args.get("since")
+        until = request.args.get("until")
+
+        return jsonify(
+            get_stats(
+                resolution,
+                int(since) if since else None,
+                int(until) if until else None,
+            )
+        )
+
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@bp.route("/api/metrics", methods=["GET"])
+@limiter.exempt
+def get_metrics_api():
+    """
+    Retrieve instrumentation about the running worker process.
+
+    Returns:
+        JSON: Memory budget usage, write-behind persistence, cache and face
+            detector statistics
+    """
+    try:
+        return jsonify(
+            {
+                "memory_budget": get_budget_usage(),
+                "write_behind": get_write_behind_stats(),
+                "cache": get_cache_stats(),
+                "detector": get_detector_stats(),
+            }
+        )
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
 @bp.route("/overlay", methods=["POST"])
 @limiter.limit("10 per minute", override_defaults=False)
 def overlay():
@@ -92,13 +163,20 @@ def overlay():
 
     This endpoint accepts an image file, processes it to detect faces and
     facial landmarks, and returns data about the detected features along with
-    a URL to access the processed image.
+    a URL to access the processed image. The duration of each processing
+    stage is reported in the Server-Timing header.
+
+    An optional deadline in milliseconds can be given in the X-Deadline-Ms
+    header or the deadline_ms parameter. Processing quality is then lowered
+    as needed to answer in time, and the degradations applied are reported
+    in the "quality" field of the response.
 
     Returns:
         JSON: Job data including URLs and processing information
     """
     try:
         start_time = time.time()
+        request_start = time.monotonic()
 
         # Check if image file is present in the request
         if "image" not in request.files:
@@ -110,32 +188,55 @@ def overlay():
         if not file.filename or "." not in file.filename:
             return jsonify({"error": "Invalid file"}), 400
 
-        # Convert image file to numpy array
-        image_np = np.frombuffer(file.read(), np.uint8)
-        image = cv2.imdecode(image_np, cv2.IMREAD_COLOR)
-
-        if image is None:
-            return jsonify({"error": "Unable to decode image"}), 400
-
-        # Process the image
-        result_image, result_data = process_image(image)
+        # Read the optional deadline
+        deadline_ms = request.headers.get("X-Deadline-Ms") or request.values.get(
+            "deadline_ms"
+        )
+        deadline = None
+        if deadline_ms is not None:
+            try:
+                deadline_ms = float(deadline_ms)
+            except ValueError:
+                return jsonify({"error": "Invalid deadline"}), 400
+            if not math.isfinite(deadline_ms) or deadline_ms <= 0:
+                return jsonify({"error": "Invalid deadline"}), 400
+
+            # The deadline runs from the start of the request, so time spent
+            # receiving the upload and waiting for a worker counts against it
+            deadline = request_start + deadline_ms / 1000
+
+        # Decode, process and encode the image
+        timings = {}
+        quality = {}
+        result_image_bytes, result_data = process_upload(
+            file.stream, timings, deadline, quality
+        )
 
         # Generate a unique job ID
         job_id = str(uuid.uuid4())
 
-        # Convert the result image to bytes
-        _, result_image_bytes = cv2.imencode(".png", result_image)
-
         # Calculate processing time
         end_time = time.time()
         processing_time = f"{(end_time - start_time) * 1000:.2f} ms"
 
         # Save job data to database
-        job_data = save_job(
-            job_id, result_image_bytes.tobytes(), processing_time, result_data
-        )
+        save_start = time.time()
+        job_data = save_job(job_id, result_image_bytes, processing_time, result_data)
+        timings["save"] = (time.time() - save_start) * 1000
+
+        if deadline is not None:
+            job_data = {**job_data, "quality": quality}
+
+        return jsonify(job_data), 200, {"Server-Timing": format_server_timing(timings)}
+
+    except ImageDecodeError as e:
+        return jsonify({"error": str(e)}), 400
+
+    except ImageTooLarge as e:
+        return jsonify({"error": str(e)}), 413
 
-        return jsonify(job_data)
+    except MemoryBudgetExceeded as e:
+        return jsonify({"error": str(e)}), 503, {"Retry-After": "1"}
 
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -0,0 +1,15 @@
+"""
+Face Detection API - ASGI entry point
+
+This is the asynchronous entry point for the Face Detection API.
+It serves the same routes as main.py from an ASGI server such as uvicorn.
+"""
+
+from app import create_asgi_app
+
+app = create_asgi_app()
+
+if __name__ == "__main__":
+    import uvicorn
+
+    uvicorn.run(app)
@@ -0,0 +1,353 @@
+"""
+Bulk processing tool for the Face Detection API
+
+This script processes a directory or a list of image files offline, without
+going through Flask or the rate-limited /overlay route. Images are processed
+across a pool of worker processes and the results are written to the same
+job store as the API in batched transactions.
+
+Job IDs are derived from each file's path, size and modification time, so an
+interrupted run can be resumed and only unfinished files are processed again.
+
+Example:
+    python bulk_process.py photos/ --output results.ndjson
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+from config import Config
+from app.helpers.database import connect_db, save_jobs, get_existing_job_ids
+from app.helpers.image_processor import init_face_detector, process_upload
+
+IMAGE_EXTENSIONS = {
+    ".jpg",
+    ".jpeg",
+    ".png",
+    ".bmp",
+    ".gif",
+    ".webp",
+    ".tif",
+    ".tiff",
+}
+
+
+def find_images(sources, file_list=None):
+    """
+    Collect the image files to process.
+
+    Args:
+        sources (list): Files and directories to process, directories are
+            searched recursively
+        file_list (str): Optional file with one image path per line
+
+    Returns:
+        list: Sorted, de-duplicated absolute image paths
+    """
+    paths = set()
+
+    for source in sources:
+        if os.path.isdir(source):
+            for root, _, files in os.walk(source):
+                for name in files:
+                    if os.path.splitext(name)[1].lower() in IMAGE_EXTENSIONS:
+                        paths.add(os.path.abspath(os.path.join(root, name)))
+        else:
+            paths.add(os.path.abspath(source))
+
+    if file_list:
+        with open(file_list) as f:
+            for line in f:
+                if line.strip():
+                    paths.add(os.path.abspath(line.strip()))
+
+    return sorted(paths)
+
+
+def job_id_for(path):
+    """
+    Derive a stable job ID for an image file.
+
+    Args:
+        path (str): Absolute image path
+
+    Returns:
+        str: Job ID that stays the same while the file is unchanged
+    """
+    stat = os.stat(path)
+    name = f"{path}:{stat.st_size}:{stat.st_mtime_ns}"
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, name))
+
+
+def read_completed(output_path):
+    """
+    Read the job IDs already written to an NDJSON output file.
+
+    Args:
+        output_path (str): NDJSON output file
+
+    Returns:
+        set: Job IDs of successfully processed images
+    """
+    completed = set()
+
+    if not output_path or not os.path.exists(output_path):
+        return completed
+
+    with open(output_path) as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # Partially written line from an interrupted run
+            if "job_id" in record and "error" not in record:
+                completed.add(record["job_id"])
+
+    return completed
+
+
+def init_worker(predictor_path, backend):
+    """Initialize the face detector in a worker process."""
+    # Tiles run in-process, the pool already uses every core
+    init_face_detector(
+        predictor_path,
+        tiled_threshold=Config.TILED_DETECTION_THRESHOLD,
+        tiled_size=Config.TILE_SIZE,
+        tiled_overlap=Config.TILE_OVERLAP,
+        tiled_workers=1,
+        backend=backend,
+        cnn_model_path=Config.CNN_MODEL_PATH,
+        cnn_batch_size=Config.CNN_BATCH_SIZE,
+        cnn_batch_wait_ms=Config.CNN_BATCH_WAIT_MS,
+        cnn_upsample_times=Config.CNN_UPSAMPLE,
+        upsample_times=Config.DETECTOR_UPSAMPLE,
+    )
+
+
+def process_file(path, job_id):
+    """
+    Decode, process and encode a single image in a worker process.
+
+    Args:
+        path (str): Image path
+        job_id (str): Job ID for the image
+
+    Returns:
+        dict: Processing result, or an error message
+    """
+    start_time = time.time()
+
+    try:
+        with open(path, "rb") as f:
+            result_image_bytes, result_data = process_upload(f)
+    except Exception as e:
+        return {"source": path, "job_id": job_id, "error": str(e)}
+
+    end_time = time.time()
+
+    return {
+        "source": path,
+        "job_id": job_id,
+        "result_image_bytes": result_image_bytes,
+        "processing_time": f"{(end_time - start_time) * 1000:.2f} ms",
+        "result_data": result_data,
+    }
+
+
+class Progress:
+    """Reports processing progress on stderr."""
+
+    def __init__(self, total, interval=1.0):
+        self.total = total
+        self.interval = interval
+        self.done = 0
+        self.errors = 0
+        self.faces = 0
+        self.start = time.time()
+        self.last_report = 0
+
+    def update(self, done=0, errors=0, faces=0, force=False):
+        """Record finished images and print a progress line periodically."""
+        self.done += done
+        self.errors += errors
+        self.faces += faces
+
+        now = time.time()
+        if not force and now - self.last_report < self.interval:
+            return
+        self.last_report = now
+
+        elapsed = now - self.start
+        rate = self.done / elapsed if elapsed else 0
+        remaining = (self.total - self.done) / rate if rate else 0
+        print(
+            f"\r{self.done}/{self.total} images, {rate:.1f} img/s, "
+            f"{self.faces} faces, {self.errors} errors, "
+            f"ETA {int(remaining // 60)}m{int(remaining % 60):02d}s",
+            end="",
+            file=sys.stderr,
+            flush=True,
+        )
+
+
+def flush_batch(batch, output):
+    """
+    Save a batch of results in one transaction and write them as NDJSON.
+
+    Results are written to the output only after they are committed, so a
+    resumed run never skips an image that was not saved.
+
+    Args:
+        batch (list): Successful processing results
+        output: NDJSON output file, or None
+    """
+    if not batch:
+        return
+
+    job_data = save_jobs(
+        [
+            (
+                result["job_id"],
+                result["result_image_bytes"],
+                result["processing_time"],
+                result["result_data"],
+            )
+            for result in batch
+        ]
+    )
+
+    if output:
+        for result, data in zip(batch, job_data):
+            output.write(json.dumps({"source": result["source"], **data}) + "\n")
+        output.flush()
+
+    batch.clear()
+
+
+def main():
+    """Main bulk processing function."""
+    parser = argparse.ArgumentParser(
+        description="Process images offline into the Face Detection API job store"
+    )
+    parser.add_argument("sources", nargs="*", help="Image files or directories")
+    parser.add_argument("--file-list", help="File with one image path per line")
+    parser.add_argument("--output", help="Append NDJSON results to this file")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Worker processes (default: number of CPU cores)",
+    )
+    parser.add_argument(
+        "--batch-size", type=int, default=100, help="Jobs per transaction"
+    )
+    parser.add_argument(
+        "--no-resume",
+        action="store_true",
+        help="Process images again as new jobs even if they were already processed",
+    )
+    parser.add_argument("--database-path", default=Config.DATABASE_PATH)
+    parser.add_argument("--image-storage-path", default=Config.IMAGE_STORAGE_PATH)
+    parser.add_argument("--predictor-path", default=Config.PREDICTOR_PATH)
+    parser.add_argument(
+        "--backend",
+        choices=("hog", "cnn"),
+        default=Config.FACE_DETECTOR_BACKEND,
+        help="Face detector backend",
+    )
+    args = parser.parse_args()
+
+    if not args.sources and not args.file_list:
+        parser.error("Provide image files, directories or --file-list")
+
+    if not os.path.exists(args.predictor_path):
+        parser.error(f"Predictor file not found at {args.predictor_path}")
+
+    connect_db(args.database_path, args.image_storage_path)
+
+    # Work out which images still need processing
+    paths = find_images(args.sources, args.file_list)
+    tasks = []
+    for path in paths:
+        try:
+            job_id = str(uuid.uuid4()) if args.no_resume else job_id_for(path)
+        except OSError as e:
+            print(f"Skipping {path}: {e}", file=sys.stderr)
+            continue
+        tasks.append((path, job_id))
+
+    if not args.no_resume:
+        completed = read_completed(args.output)
+        completed |= get_existing_job_ids(job_id for _, job_id in tasks)
+        tasks = [task for task in tasks if task[1] not in completed]
+        skipped = len(paths) - len(tasks)
+        if skipped:
+            print(f"Resuming, skipping {skipped} processed images", file=sys.stderr)
+
+    progress = Progress(len(tasks))
+    output = open(args.output, "a") if args.output else None
+    batch = []
+    pending = set()
+    task_iter = iter(tasks)
+
+    # Keep a bounded number of images in flight to limit memory use
+    max_in_flight = args.workers * 4
+
+    try:
+        with ProcessPoolExecutor(
+            max_workers=args.workers,
+            initializer=init_worker,
+            initargs=(args.predictor_path, args.backend),
+        ) as executor:
+            while True:
+                for path, job_id in task_iter:
+                    pending.add(executor.submit(process_file, path, job_id))
+                    if len(pending) >= max_in_flight:
+                        break
+
+                if not pending:
+                    break
+
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+
+                for future in done:
+                    result = future.result()
+
+                    if "error" in result:
+                        print(
+                            f"\nError processing {result['source']}: "
+                            f"{result['error']}",
+                            file=sys.stderr,
+                        )
+                        if output:
+                            output.write(json.dumps(result) + "\n")
+                        progress.update(done=1, errors=1)
+                        continue
+
+                    batch.append(result)
+                    progress.update(done=1, faces=len(result["result_data"]))
+
+                    if len(batch) >= args.batch_size:
+                        flush_batch(batch, output)
+
+            flush_batch(batch, output)
+    except KeyboardInterrupt:
+        # Save what has been processed so the run can be resumed
+        flush_batch(batch, output)
+        print("\nInterrupted, run again to resume", file=sys.stderr)
+        sys.exit(130)
+    finally:
+        if output:
+            output.close()
+
+    progress.update(force=True)
+    print(file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
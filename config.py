@@ -19,6 +19,12 @@ class Config:
     JOB_EXPIRE_AFTER = int(
         os.getenv("job_expire_after", 3600)
     )  # Default 1 hour in seconds
+    STATS_MINUTE_RETENTION = int(
+        os.getenv("stats_minute_retention", 604800)
+    )  # Default 7 days in seconds
+    STATS_HOUR_RETENTION = int(
+        os.getenv("stats_hour_retention", 31536000)
+    )  # Default 365 days in seconds
 
     # Application settings
     PREDICTOR_PATH = os.getenv(
@@ -26,3 +32,74 @@ class Config:
     )
     DEBUG = os.getenv("debug", "False").lower() == "true"
     IMAGE_STORAGE_PATH = os.getenv("image_storage_path", "data/images")
+    RATELIMIT_ENABLED = os.getenv("ratelimit_enabled", "True").lower() == "true"
+
+    # Tiled detection settings
+    TILED_DETECTION_THRESHOLD = int(
+        os.getenv("tiled_detection_threshold", 24000000)
+    )  # Pixel count above which tiled detection is used, 0 disables it
+    # (the default leaves ordinary phone photos on the single-pass path)
+    TILE_SIZE = int(os.getenv("tile_size", 1536))
+    TILE_OVERLAP = int(os.getenv("tile_overlap", 256))
+    TILE_WORKERS = int(
+        os.getenv("tile_workers", 0)
+    )  # Default 0 uses one worker process per CPU core
+
+    # Memory settings
+    MEMORY_BUDGET = int(
+        os.getenv("memory_budget", 1073741824)
+    )  # Default 1 GiB for decoded images in flight, 0 disables the budget
+    MEMORY_BUDGET_WAIT_TIMEOUT = float(
+        os.getenv("memory_budget_wait_timeout", 10)
+    )  # Seconds a request waits for memory before it is rejected
+    UPLOAD_SPOOL_THRESHOLD = int(
+        os.getenv("upload_spool_threshold", 524288)
+    )  # Uploads larger than this (default 512 KiB) are spooled to disk
+    UPLOAD_SPOOL_DIR = os.getenv("upload_spool_dir") or None
+
+    # ASGI settings
+    ASGI_CPU_WORKERS = int(
+        os.getenv("asgi_cpu_workers", 0)
+    )  # Default 0 uses one thread per CPU core for image processing
+    ASGI_DB_WORKERS = int(
+        os.getenv("asgi_db_workers", 1)
+    )  # Threads for database and file work, the SQLite connection is shared
+
+    # Write-behind persistence settings
+    WRITE_BEHIND = os.getenv("write_behind", "False").lower() == "true"
+    WRITE_BEHIND_MAX_PENDING_JOBS = int(
+        os.getenv("write_behind_max_pending_jobs", 1000)
+    )
+    WRITE_BEHIND_MAX_PENDING_BYTES = int(
+        os.getenv("write_behind_max_pending_bytes", 268435456)
+    )  # Default 256 MiB of result images waiting to be flushed
+    WRITE_BEHIND_BATCH_SIZE = int(os.getenv("write_behind_batch_size", 100))
+    WRITE_BEHIND_FLUSH_INTERVAL = float(
+        os.getenv("write_behind_flush_interval", 0.05)
+    )  # Seconds the writer waits for a batch to fill up
+    WRITE_BEHIND_SHUTDOWN_TIMEOUT = float(
+        os.getenv("write_behind_shutdown_timeout", 10)
+    )  # Seconds to wait for pending jobs to be flushed at shutdown
+    WRITE_BEHIND_ENQUEUE_TIMEOUT = float(
+        os.getenv("write_behind_enqueue_timeout", 10)
+    )  # Seconds a job waits for the writer before it is written directly
+
+    # Cache settings (0 disables a cache)
+    JOB_CACHE_MAX_BYTES = int(
+        os.getenv("job_cache_max_bytes", 16777216)
+    )  # Memory for recently used job data (16 MiB)
+    IMAGE_CACHE_MAX_BYTES = int(
+        os.getenv("image_cache_max_bytes", 67108864)
+    )  # Memory for recently used result images (64 MiB)
+
+    # Face detector backend settings
+    FACE_DETECTOR_BACKEND = os.getenv("face_detector_backend", "hog").lower()
+    CNN_MODEL_PATH = os.getenv("cnn_model_path", "data/mmod_human_face_detector.dat")
+    CNN_BATCH_SIZE = int(os.getenv("cnn_batch_size", 8))
+    CNN_BATCH_WAIT_MS = float(
+        os.getenv("cnn_batch_wait_ms", 5)
+    )  # Longest a request waits for a CNN batch to fill up
+    CNN_UPSAMPLE = int(os.getenv("cnn_upsample", 0))
+    DETECTOR_UPSAMPLE = int(
+        os.getenv("detector_upsample", 0)
+    )  # HOG detector upsampling at full quality, lowered to meet deadlines
@@ -0,0 +1,664 @@
+"""
+Load-testing harness for the Face Detection API
+
+This script starts the application locally from create_app with rate limits
+disabled and drives /overlay, /jobs/<job_id>, the result image and /api/jobs
+with a configurable concurrency and request mix of synthetic images. It
+writes a JSON report with throughput, latency percentiles, error rates and
+per-stage timings that can be compared across runs.
+
+Example:
+    python loadtest.py --duration 60 --concurrency 16 --workers 4 \\
+        --sizes 640x480:3,1920x1080:1 --output report.json
+"""
+
+import argparse
+import http.client
+import json
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+from config import Config
+
+PERCENTILES = (50, 90, 95, 99)
+
+
+def parse_weights(value, cast=str):
+    """
+    Parse a weighted mix such as "overlay:1,job:4".
+
+    Args:
+        value (str): Comma-separated entries with optional ":weight" suffix
+        cast: Function converting each entry name
+
+    Returns:
+        list: (entry, weight) tuples
+    """
+    mix = []
+
+    for part in value.split(","):
+        name, _, weight = part.strip().partition(":")
+        mix.append((cast(name), float(weight or 1)))
+
+    return mix
+
+
+def parse_size(value):
+    """Parse an image size such as "1920x1080" into (width, height)."""
+    width, _, height = value.lower().partition("x")
+    return int(width), int(height)
+
+
+def generate_image(width, height, faces, face_image, rng):
+    """
+    Generate a synthetic JPEG image.
+
+    The background is smooth noise. When a face image is given it is pasted
+    at random positions the requested number of times.
+
+    Args:
+        width (int): Image width
+        height (int): Image height
+        faces (int): Number of faces to paste
+        face_image (numpy.ndarray): Face image to paste, or None
+        rng (numpy.random.Generator): Random number generator
+
+    Returns:
+        bytes: JPEG-encoded image
+    """
+    small = rng.integers(0, 256, (max(1, height // 32), max(1, width // 32), 3))
+    image = cv2.resize(small.astype(np.uint8), (width, height))
+
+    if face_image is not None:
+        for _ in range(faces):
+            shortest = min(width, height)
+            size = int(rng.integers(shortest // 8, shortest // 3))
+            face = cv2.resize(face_image, (size, size))
+            x = int(rng.integers(0, width - size + 1))
+            y = int(rng.integers(0, height - size + 1))
+            image[y : y + size, x : x + size] = face
+
+    _, encoded = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, 90])
+    return encoded.tobytes()
+
+
+def build_image_pool(sizes, faces, face_image, variants, seed):
+    """
+    Pre-generate the synthetic images sent to /overlay.
+
+    Args:
+        sizes (list): (size, weight) tuples
+        faces (list): (face count, weight) tuples
+        face_image (numpy.ndarray): Face image to paste, or None
+        variants (int): Number of images per size and face count
+        seed (int): Random seed
+
+    Returns:
+        list: (label, image bytes, weight) tuples
+    """
+    rng = np.random.default_rng(seed)
+    pool = []
+
+    for (width, height), size_weight in sizes:
+        for face_count, face_weight in faces:
+            label = f"{width}x{height}/{face_count}faces"
+            for _ in range(variants):
+                image = generate_image(width, height, face_count, face_image, rng)
+                pool.append((label, image, size_weight * face_weight / variants))
+
+    return pool
+
+
+def start_wsgi_server(app, host, workers):
+    """
+    Serve the Flask application from a background thread.
+
+    Requests are handled by a fixed-size thread pool so the worker count can
+    be varied between runs.
+
+    Args:
+        app: Flask application
+        host (str): Interface to bind to
+        workers (int): Number of request handler threads
+
+    Returns:
+        tuple: (port, stop function)
+    """
+    from werkzeug.serving import BaseWSGIServer
+
+    class PooledWSGIServer(BaseWSGIServer):
+        """WSGI server that handles requests in a bounded thread pool."""
+
+        multithread = True
+        request_queue_size = 1024
+
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            self.executor = ThreadPoolExecutor(max_workers=workers)
+
+        def process_request(self, request, client_address):
+            self.executor.submit(self.handle_pooled, request, client_address)
+
+        def handle_pooled(self, request, client_address):
+            try:
+                self.finish_request(request, client_address)
+            except Exception:
+                self.handle_error(request, client_address)
+            finally:
+                self.shutdown_request(request)
+
+    server = PooledWSGIServer(host, 0, app)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    def stop():
+        server.shutdown()
+        server.executor.shutdown(wait=True)
+
+    return server.server_port, stop
+
+
+def start_asgi_server(config_class, host):
+    """
+    Serve the ASGI application from a background thread.
+
+    Args:
+        config_class: Configuration class
+        host (str): Interface to bind to
+
+    Returns:
+        tuple: (port, stop function)
+    """
+    import socket
+
+    import uvicorn
+
+    from app import create_asgi_app
+
+    sock = socket.socket()
+    sock.bind((host, 0))
+    port = sock.getsockname()[1]
+
+    server = uvicorn.Server(
+        uvicorn.Config(
+            create_asgi_app(config_class),
+            log_level="warning",
+            access_log=False,
+            backlog=1024,
+        )
+    )
+    thread = threading.Thread(target=server.run, args=([sock],), daemon=True)
+    thread.start()
+
+    while not server.started:
+        time.sleep(0.05)
+
+    def stop():
+        server.should_exit = True
+        thread.join()
+
+    return port, stop
+
+
+def parse_server_timing(header):
+    """
+    Parse a Server-Timing header into stage durations.
+
+    Args:
+        header (str): Server-Timing header value
+
+    Returns:
+        dict: Stage durations in milliseconds
+    """
+    timings = {}
+
+    for entry in (header or "").split(","):
+        name, _, params = entry.strip().partition(";")
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "dur" and name:
+                timings[name] = float(value)
+
+    return timings
+
+
+def encode_multipart(image):
+    """
+    Encode an image as a multipart/form-data body.
+
+    Args:
+        image (bytes): Image file contents
+
+    Returns:
+        tuple: (body bytes, content type)
+    """
+    boundary = uuid.uuid4().hex
+    body = b"".join(
+        [
+            f"--{boundary}\r\n".encode(),
+            b'Content-Disposition: form-data; name="image"; filename="image.jpg"\r\n',
+            b"Content-Type: image/jpeg\r\n\r\n",
+            image,
+            f"\r\n--{boundary}--\r\n".encode(),
+        ]
+    )
+    return body, f"multipart/form-data; boundary={boundary}"
+
+
+class LoadTest:
+    """Drives the API and records the results of every request."""
+
+    def __init__(self, host, port, args, image_pool):
+        self.host = host
+        self.port = port
+        self.args = args
+        self.image_pool = image_pool
+        self.request_mix = parse_weights(args.mix)
+        self.job_ids = []
+        self.lock = threading.Lock()
+        self.samples = []
+        self.started_requests = 0
+
+    def request(self, method, path, body=None, headers=None):
+        """
+        Send a single HTTP request on a new connection.
+
+        Returns:
+            tuple: (status code, response headers, response body)
+        """
+        connection = http.client.HTTPConnection(
+            self.host, self.port, timeout=self.args.timeout
+        )
+        try:
+            connection.request(method, path, body=body, headers=headers or {})
+            response = connection.getresponse()
+            return response.status, response.headers, response.read()
+        finally:
+            connection.close()
+
+    def pick_endpoint(self, rng):
+        """Pick the next endpoint from the request mix."""
+        names = [name for name, _ in self.request_mix]
+        weights = [weight for _, weight in self.request_mix]
+        endpoint = rng.choices(names, weights)[0]
+
+        # Job lookups need a job to exist first
+        if endpoint in ("job", "image") and not self.job_ids:
+            return "overlay"
+
+        return endpoint
+
+    def run_one(self, rng, measuring):
+        """Send one request from the mix and record its outcome."""
+        endpoint = self.pick_endpoint(rng)
+        label = endpoint
+        headers = {}
+
+        if endpoint == "overlay":
+            labels, images, weights = zip(*self.image_pool)
+            index = rng.choices(range(len(images)), weights)[0]
+            label = f"overlay {labels[index]}"
+            body, content_type = encode_multipart(images[index])
+            args = ("POST", "/overlay", body, {"Content-Type": content_type})
+        elif endpoint == "job":
+            args = ("GET", f"/jobs/{rng.choice(self.job_ids)}")
+        elif endpoint == "image":
+            args = ("GET", f"/jobs/{rng.choice(self.job_ids)}/result_image.png")
+        else:
+            args = ("GET", f"/api/jobs?page={rng.randint(1, 5)}&limit=10")
+
+        start = time.perf_counter()
+        try:
+            status, headers, body = self.request(*args)
+            error = None
+        except Exception as e:
+            status, body, error = 0, b"", type(e).__name__
+        latency = (time.perf_counter() - start) * 1000
+
+        if endpoint == "overlay" and status == 200:
+            with self.lock:
+                self.job_ids.append(json.loads(body)["job_id"])
+
+        if measuring:
+            with self.lock:
+                self.samples.append(
+                    {
+                        "endpoint": endpoint,
+                        "label": label,
+                        "status": status,
+                        "error": error,
+                        "latency_ms": latency,
+                        "stages": parse_server_timing(
+                            headers.get("Server-Timing") if headers else None
+                        ),
+                    }
+                )
+
+    def worker(self, seed, warmup_end, end):
+        """Send requests until the deadline or the request limit is reached."""
+        rng = random.Random(seed)
+
+        while time.perf_counter() < end:
+            with self.lock:
+                if self.args.requests and self.started_requests >= self.args.requests:
+                    return
+                measuring = time.perf_counter() >= warmup_end
+                if measuring:
+                    self.started_requests += 1
+
+            self.run_one(rng, measuring)
+
+    def run(self):
+        """
+        Run the load test.
+
+        Returns:
+            float: Duration of the measured part of the run in seconds
+        """
+        start = time.perf_counter()
+        warmup_end = start + self.args.warmup
+        end = warmup_end + self.args.duration
+
+        with ThreadPoolExecutor(max_workers=self.args.concurrency) as executor:
+            futures = [
+                executor.submit(self.worker, self.args.seed + i, warmup_end, end)
+                for i in range(self.args.concurrency)
+            ]
+            for future in futures:
+                future.result()
+
+        return time.perf_counter() - max(start, warmup_end)
+
+
+def summarize_latencies(latencies):
+    """
+    Summarize a list of latencies.
+
+    Args:
+        latencies (list): Latencies in milliseconds
+
+    Returns:
+        dict: Mean, maximum and percentile latencies
+    """
+    if not latencies:
+        return {}
+
+    values = np.asarray(latencies)
+    summary = {
+        "mean_ms": round(float(values.mean()), 3),
+        "max_ms": round(float(values.max()), 3),
+    }
+    for percentile in PERCENTILES:
+        value = np.percentile(values, percentile)
+        summary[f"p{percentile}_ms"] = round(float(value), 3)
+
+    return summary
+
+
+def summarize_group(samples, duration):
+    """
+    Summarize the samples of one endpoint or request label.
+
+    Args:
+        samples (list): Request samples
+        duration (float): Measured duration in seconds
+
+    Returns:
+        dict: Counts, throughput, error rate, latencies and stage timings
+    """
+    statuses = defaultdict(int)
+    stages = defaultdict(list)
+
+    for sample in samples:
+        statuses[sample["error"] or str(sample["status"])] += 1
+        for stage, value in sample["stages"].items():
+            stages[stage].append(value)
+
+    errors = sum(1 for sample in samples if sample["status"] != 200)
+    successful = [s["latency_ms"] for s in samples if s["status"] == 200]
+
+    return {
+        "requests": len(samples),
+        "throughput_rps": round(len(samples) / duration, 3) if duration else 0.0,
+        "error_rate": round(errors / len(samples), 4) if samples else 0.0,
+        "statuses": dict(statuses),
+        "latency": summarize_latencies(successful),
+        "stages": {stage: summarize_latencies(v) for stage, v in stages.items()},
+    }
+
+
+def build_report(args, samples, duration, server_metrics):
+    """
+    Build the machine-readable report of a run.
+
+    Args:
+        args: Parsed command-line arguments
+        samples (list): Request samples
+        duration (float): Measured duration in seconds
+        server_metrics (dict): Response of /api/metrics after the run
+
+    Returns:
+        dict: Report
+    """
+    by_endpoint = defaultdict(list)
+    by_label = defaultdict(list)
+
+    for sample in samples:
+        by_endpoint[sample["endpoint"]].append(sample)
+        if sample["endpoint"] == "overlay":
+            by_label[sample["label"]].append(sample)
+
+    return {
+        "run": {
+            "timestamp": int(time.time()),
+            "server": args.server,
+            "workers": args.workers,
+            "concurrency": args.concurrency,
+            "duration_s": round(duration, 3),
+            "mix": args.mix,
+            "sizes": args.sizes,
+            "faces": args.faces,
+            "face_image": args.face_image,
+            "seed": args.seed,
+            "python": platform.python_version(),
+            "cpu_count": os.cpu_count(),
+        },
+        "total": summarize_group(samples, duration),
+        "endpoints": {
+            name: summarize_group(group, duration)
+            for name, group in sorted(by_endpoint.items())
+        },
+        "overlay_images": {
+            name: summarize_group(group, duration)
+            for name, group in sorted(by_label.items())
+        },
+        "server_metrics": server_metrics,
+    }
+
+
+def compare_reports(baseline, report):
+    """
+    Print throughput and latency changes relative to a baseline report.
+
+    Args:
+        baseline (dict): Report of an earlier run
+        report (dict): Report of this run
+    """
+    print("\nComparison with baseline:", file=sys.stderr)
+
+    groups = [("total", baseline.get("total"), report["total"])]
+    groups += [
+        (name, baseline.get("endpoints", {}).get(name), summary)
+        for name, summary in report["endpoints"].items()
+    ]
+
+    for name, old, new in groups:
+        if not old:
+            continue
+
+        parts = []
+        for key, old_value, new_value in (
+            ("rps", old["throughput_rps"], new["throughput_rps"]),
+            ("p50", old["latency"].get("p50_ms"), new["latency"].get("p50_ms")),
+            ("p99", old["latency"].get("p99_ms"), new["latency"].get("p99_ms")),
+        ):
+            if old_value and new_value is not None:
+                change = (new_value - old_value) / old_value * 100
+                parts.append(f"{key} {old_value:g} -> {new_value:g} ({change:+.1f}%)")
+
+        print(f"  {name:8} " + ", ".join(parts), file=sys.stderr)
+
+
+def main():
+    """Main load-test function."""
+    parser = argparse.ArgumentParser(description="Load test the Face Detection API")
+    parser.add_argument(
+        "--server", choices=("wsgi", "asgi"), default="wsgi", help="Server to test"
+    )
+    parser.add_argument(
+        "--workers", type=int, default=4, help="Server worker threads (default: 4)"
+    )
+    parser.add_argument(
+        "--concurrency", type=int, default=8, help="Concurrent clients (default: 8)"
+    )
+    parser.add_argument(
+        "--duration", type=float, default=30, help="Measured seconds (default: 30)"
+    )
+    parser.add_argument(
+        "--warmup", type=float, default=5, help="Unmeasured seconds (default: 5)"
+    )
+    parser.add_argument(
+        "--requests", type=int, default=0, help="Stop after this many requests"
+    )
+    parser.add_argument(
+        "--mix",
+        default="overlay:1,job:2,image:1,list:1",
+        help="Weighted request mix of overlay, job, image and list",
+    )
+    parser.add_argument(
+        "--sizes",
+        default="640x480:3,1280x720:2,1920x1080:1",
+        help="Weighted mix of synthetic image sizes",
+    )
+    parser.add_argument(
+        "--faces", default="0", help="Weighted mix of faces per synthetic image"
+    )
+    parser.add_argument(
+        "--face-image", help="Face photo pasted into synthetic images for --faces"
+    )
+    parser.add_argument(
+        "--variants", type=int, default=4, help="Images per size and face count"
+    )
+    parser.add_argument("--timeout", type=float, default=60, help="Request timeout")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    parser.add_argument("--compare", help="Baseline report to compare against")
+    parser.add_argument(
+        "--keep-data",
+        action="store_true",
+        help="Keep the load test database and result images after the run",
+    )
+    args = parser.parse_args()
+
+    face_image = None
+    if args.face_image:
+        face_image = cv2.imread(args.face_image, cv2.IMREAD_COLOR)
+        if face_image is None:
+            parser.error(f"Unable to read face image {args.face_image}")
+
+    print("Generating synthetic images...", file=sys.stderr)
+    image_pool = build_image_pool(
+        parse_weights(args.sizes, parse_size),
+        parse_weights(args.faces, int),
+        face_image,
+        args.variants,
+        args.seed,
+    )
+
+    # Run against a throwaway database with rate limits disabled
+    data_dir = tempfile.mkdtemp(prefix="face-detection-loadtest-")
+    config_class = type(
+        "LoadTestConfig",
+        (Config,),
+        {
+            "RATELIMIT_ENABLED": False,
+            "DATABASE_PATH": os.path.join(data_dir, "face_detection.db"),
+            "IMAGE_STORAGE_PATH": os.path.join(data_dir, "images"),
+            "ASGI_CPU_WORKERS": args.workers,
+        },
+    )
+
+    if not os.path.exists(config_class.PREDICTOR_PATH):
+        print(
+            f"Predictor file not found at {config_class.PREDICTOR_PATH}, "
+            f"/overlay requests will fail",
+            file=sys.stderr,
+        )
+
+    host = "127.0.0.1"
+    try:
+        if args.server == "asgi":
+            port, stop = start_asgi_server(config_class, host)
+        else:
+            from app import create_app
+
+            port, stop = start_wsgi_server(
+                create_app(config_class), host, args.workers
+            )
+
+        print(
+            f"Running {args.server} server on port {port} for {args.duration}s "
+            f"with {args.concurrency} clients...",
+            file=sys.stderr,
+        )
+
+        load_test = LoadTest(host, port, args, image_pool)
+        try:
+            duration = load_test.run()
+            status, _, body = load_test.request("GET", "/api/metrics")
+            server_metrics = json.loads(body) if status == 200 else {}
+        finally:
+            stop()
+    finally:
+        if args.keep_data:
+            print(f"Load test data kept in {data_dir}", file=sys.stderr)
+        else:
+            shutil.rmtree(data_dir, ignore_errors=True)
+
+    report = build_report(args, load_test.samples, duration, server_metrics)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+        print(f"Report written to {args.output}", file=sys.stderr)
+    else:
+        print(output)
+
+    total = report["total"]
+    print(
+        f"\n{total['requests']} requests, {total['throughput_rps']} req/s, "
+        f"p99 {total['latency'].get('p99_ms', 0)} ms, "
+        f"error rate {total['error_rate']:.2%}",
+        file=sys.stderr,
+    )
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare_reports(json.load(f), report)
+
+
+if __name__ == "__main__":
+    main()
@@ -48,6 +48,24 @@ def setup_database():
     """
     )
 
+    # Create statistics rollup table
+    cursor.execute(
+        """
+    CREATE TABLE IF NOT EXISTS job_stats (
+        resolution TEXT,
+        bucket_start INTEGER,
+        jobs INTEGER,
+        faces INTEGER,
+        zero_face_jobs INTEGER,
+        max_faces INTEGER,
+        total_processing_ms REAL,
+        latency_sketch TEXT,
+        faces_histogram TEXT,
+        PRIMARY KEY (resolution, bucket_start)
+    )
+    """
+    )
+
     # Commit changes and close connection
     conn.commit()
     conn.close()
@@ -63,6 +81,8 @@ def create_env_file():
                 """# Database configuration
 database_path=data/face_detection.db
 job_expire_after=3600
+stats_minute_retention=604800
+stats_hour_retention=31536000
 
 # Storage
 image_storage_path=data/images